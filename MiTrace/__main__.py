@@ -0,0 +1,144 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: __main__.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 10:30
+@Description: Command line entry of MiTrace, run by `python -m MiTrace`
+"""
+import argparse
+import os
+
+from MiTrace.io.batch import find_videos, run_batch
+from MiTrace.io.headless import run_video
+from MiTrace.trace.analysis import DEFAULT_FORMATS, FIGURE_FORMATS, RESULT_FORMATS
+from MiTrace.trace.detectors import DETECTORS
+from MiTrace.trace.heatmap import DEFAULT_BIN_SIZE, DEFAULT_SIGMA
+from MiTrace.trace.kinematics import DEFAULT_IMMOBILITY_SECONDS, DEFAULT_IMMOBILITY_SPEED
+from MiTrace.io.session import DEFAULT_SESSION, load_session
+from MiTrace.trace.roi import roi_name
+
+
+def parse_args(argv=None):
+    """
+    Parse the command line arguments
+
+    Parameters
+    ----------
+    argv : List, optional
+        Arguments, default is sys.argv[1:]
+
+    Returns
+    -------
+    args : argparse.Namespace
+    """
+
+    parser = argparse.ArgumentParser(prog='python -m MiTrace',
+                                     description='Track a video without GUI and save the results.')
+    parser.add_argument('video', help='path of the video, or a folder of videos run as a batch')
+    parser.add_argument('-o', '--output', required=True, help='folder to save the results')
+    parser.add_argument('-f', '--formats', nargs='+', choices=RESULT_FORMATS, default=list(DEFAULT_FORMATS),
+                        help='formats of the result tables, xlsx falls back to csv for long recordings')
+    parser.add_argument('--figure-format', choices=FIGURE_FORMATS, default='pdf',
+                        help='format of the trace and heatmap figures, the trace is rasterized in the pdf')
+    parser.add_argument('--checkpoint-interval', type=int, default=0,
+                        help='flush the detection to OUTPUT/checkpoint.json every N frames')
+    parser.add_argument('--resume', action='store_true',
+                        help='resume the detection from OUTPUT/checkpoint.json')
+    parser.add_argument('-s', '--stride', type=int, default=1,
+                        help='only detect every STRIDE-th frame, the others are interpolated')
+    parser.add_argument('-r', '--search-radius', type=int,
+                        help='search the object in a window of this half size around its predicted position')
+    parser.add_argument('--timing', action='store_true',
+                        help='time the stages of every frame, save them into OUTPUT/timing.csv')
+    parser.add_argument('--heatmap-bin', type=int, default=DEFAULT_BIN_SIZE,
+                        help='pixels per bin of the heatmap')
+    parser.add_argument('--heatmap-sigma', type=float, default=DEFAULT_SIGMA,
+                        help='sigma of the gaussian smoothing of the heatmap in pixels, 0 for none')
+    parser.add_argument('--fps', type=float, help='frames per second, default is the frame rate of the video')
+    parser.add_argument('--immobility-speed', type=float, default=DEFAULT_IMMOBILITY_SPEED,
+                        help='speed under which the object is immobile, cm/s with --px-per-cm or px/s')
+    parser.add_argument('--immobility-seconds', type=float, default=DEFAULT_IMMOBILITY_SECONDS,
+                        help='shortest immobility bout in seconds')
+    parser.add_argument('--bin-seconds', type=float,
+                        help='also summarize the distance and the roi occupancy by bins of this many seconds')
+    parser.add_argument('--memmap', action='store_true',
+                        help='store the trajectory in memory-mapped files in OUTPUT/trajectory')
+    parser.add_argument('-c', '--config', help='JSON session file, the other arguments override it')
+    parser.add_argument('--crop', nargs=4, type=int, metavar=('X', 'Y', 'WIDTH', 'HEIGHT'),
+                        help='area of the video for detection (video_adjust), default is the whole frame')
+    parser.add_argument('--roi', nargs=4, type=int, action='append', metavar=('X', 'Y', 'WIDTH', 'HEIGHT'),
+                        help='add a roi, can be used multiple times')
+    parser.add_argument('--roi-name', action='append', help='name of the roi, in the order of --roi')
+    parser.add_argument('--threshold', type=int, help='threshold for cv2.inRange')
+    parser.add_argument('--px-per-cm', type=float, help='pixels per centimeter, the kinematics are in centimeters')
+    parser.add_argument('--detector', choices=tuple(DETECTORS), help='detector locating the object')
+    parser.add_argument('--start-frame', type=int, help='detect video from which frame')
+    parser.add_argument('--end-frame', type=int, help='end frame of detection, -1 for no limit')
+    parser.add_argument('-j', '--workers', type=int, default=1,
+                        help='number of processes, each one detects a segment of the video')
+    parser.add_argument('-q', '--queue-depth', type=int, default=0,
+                        help='decode frames ahead in a reader thread with a queue of this depth')
+    parser.add_argument('--jobs', type=int,
+                        help='number of videos run at the same time for a folder, default is the number of cores')
+
+    args = parser.parse_args(argv)
+
+    # The processes of --workers detect the segments of a single video in memory, without these
+    if args.workers > 1 and os.path.isdir(args.video):
+        parser.error('--workers is for a single video, use --jobs for a folder')
+    if args.workers > 1:
+        unsupported = [flag for flag, used in (('--resume', args.resume),
+                                               ('--checkpoint-interval', args.checkpoint_interval > 0),
+                                               ('--memmap', args.memmap), ('--timing', args.timing),
+                                               ('--queue-depth', args.queue_depth > 0)) if used]
+        if unsupported:
+            parser.error(f'{", ".join(unsupported)} can not be used with --workers {args.workers}')
+
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+
+    session = load_session(args.config) if args.config else dict(DEFAULT_SESSION)
+    if args.crop:
+        session['video_adjust'] = args.crop
+    if args.roi:
+        session['roi_lst'] = args.roi
+        session['roi_name_lst'] = args.roi_name or []
+        session['roi_name_lst'] += [roi_name(each) for each in args.roi[len(session['roi_name_lst']):]]
+    if args.threshold is not None:
+        session['threshold'] = args.threshold
+    if args.detector is not None:
+        session['detector'] = args.detector
+    if args.px_per_cm is not None:
+        session['px_per_cm'] = args.px_per_cm
+    if args.start_frame is not None:
+        session['start_frame'] = args.start_frame
+    if args.end_frame is not None:
+        session['end_frame'] = args.end_frame
+
+    options = dict(queue_depth=args.queue_depth, formats=args.formats,
+                   checkpoint_interval=args.checkpoint_interval, resume=args.resume,
+                   memmap=args.memmap, frame_stride=args.stride,
+                   search_radius=args.search_radius, timing=args.timing,
+                   heatmap_bin_size=args.heatmap_bin, heatmap_sigma=args.heatmap_sigma,
+                   figure_format=args.figure_format, fps=args.fps, immobility_speed=args.immobility_speed,
+                   immobility_seconds=args.immobility_seconds, bin_seconds=args.bin_seconds)
+
+    if os.path.isdir(args.video):
+        video_paths = find_videos(args.video)
+        if not video_paths:
+            raise SystemExit(f'No video found in {args.video}')
+        run_batch(video_paths, args.output, session, jobs=args.jobs, **options)
+        return
+
+    info, _ = run_video(video_path=args.video, folder_path=args.output, workers=args.workers,
+                        **options, **session)
+    print(info)
+
+
+if __name__ == '__main__':
+    main()
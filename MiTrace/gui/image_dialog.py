@@ -14,11 +14,15 @@ from PyQt5 import QtCore, QtGui, QtWidgets
 class Ui_image_dialog(object):
     def setupUi(self, image_dialog):
         image_dialog.setObjectName("image_dialog")
-        image_dialog.resize(836, 583)
+        image_dialog.resize(836, 713)
         self.imageLabel = QtWidgets.QLabel(image_dialog)
         self.imageLabel.setGeometry(QtCore.QRect(20, 60, 791, 501))
         self.imageLabel.setText("")
         self.imageLabel.setObjectName("imageLabel")
+        self.histLabel = QtWidgets.QLabel(image_dialog)
+        self.histLabel.setGeometry(QtCore.QRect(20, 570, 791, 121))
+        self.histLabel.setText("")
+        self.histLabel.setObjectName("histLabel")
         self.label = QtWidgets.QLabel(image_dialog)
         self.label.setGeometry(QtCore.QRect(20, 10, 131, 31))
         font = QtGui.QFont()
@@ -70,6 +70,30 @@ class Ui_MiTrace(object):
         font.setPointSize(12)
         self.saveBt.setFont(font)
         self.saveBt.setObjectName("saveBt")
+        self.formatBox = QtWidgets.QComboBox(self.centralwidget)
+        self.formatBox.setGeometry(QtCore.QRect(310, 630, 181, 31))
+        font = QtGui.QFont()
+        font.setFamily("Microsoft JhengHei UI")
+        font.setPointSize(12)
+        self.formatBox.setFont(font)
+        self.formatBox.setObjectName("formatBox")
+        self.formatBox.addItem("")
+        self.formatBox.addItem("")
+        self.formatBox.addItem("")
+        self.loadSessionBt = QtWidgets.QPushButton(self.centralwidget)
+        self.loadSessionBt.setGeometry(QtCore.QRect(580, 630, 151, 31))
+        font = QtGui.QFont()
+        font.setFamily("Microsoft JhengHei UI")
+        font.setPointSize(12)
+        self.loadSessionBt.setFont(font)
+        self.loadSessionBt.setObjectName("loadSessionBt")
+        self.saveSessionBt = QtWidgets.QPushButton(self.centralwidget)
+        self.saveSessionBt.setGeometry(QtCore.QRect(750, 630, 151, 31))
+        font = QtGui.QFont()
+        font.setFamily("Microsoft JhengHei UI")
+        font.setPointSize(12)
+        self.saveSessionBt.setFont(font)
+        self.saveSessionBt.setObjectName("saveSessionBt")
         self.ROIListView = QtWidgets.QListView(self.centralwidget)
         self.ROIListView.setGeometry(QtCore.QRect(40, 190, 321, 431))
         self.ROIListView.setMinimumSize(QtCore.QSize(320, 0))
@@ -153,6 +177,11 @@ class Ui_MiTrace(object):
         self.label.setText(_translate("MiTrace", "Start Frame:"))
         self.label_2.setText(_translate("MiTrace", "End Frame:"))
         self.saveBt.setText(_translate("MiTrace", "Save"))
+        self.formatBox.setItemText(0, _translate("MiTrace", "Parquet + NPZ"))
+        self.formatBox.setItemText(1, _translate("MiTrace", "CSV"))
+        self.formatBox.setItemText(2, _translate("MiTrace", "Excel (short video)"))
+        self.loadSessionBt.setText(_translate("MiTrace", "Load Session"))
+        self.saveSessionBt.setText(_translate("MiTrace", "Save Session"))
         self.addROIBt.setText(_translate("MiTrace", "Add ROI"))
         self.removeROIBt.setText(_translate("MiTrace", "Remove ROI"))
         self.ResizeVideoBt.setText(_translate("MiTrace", "Resize video"))
@@ -0,0 +1,151 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: batch.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 19:40
+@Description: Apply a session to a folder of videos, one video per process
+"""
+import csv
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import cv2
+
+from MiTrace.io.headless import run_video
+
+VIDEO_EXTENSIONS = ('.mp4', '.wmv', '.avi', '.mov', '.mkv')
+SUMMARY_FIELDS = ('video', 'status', 'frames', 'seconds', 'fps', 'output', 'error')
+
+
+def find_videos(folder_path):
+    """
+    Videos in a folder, not recursive
+
+    Parameters
+    ----------
+    folder_path : str
+
+    Returns
+    -------
+    video_paths : List
+        Sorted paths of the videos with VIDEO_EXTENSIONS
+    """
+
+    return sorted(os.path.join(folder_path, each) for each in os.listdir(folder_path)
+                  if os.path.splitext(each)[1].lower() in VIDEO_EXTENSIONS)
+
+
+def output_folders(video_paths, folder_path):
+    """
+    Output folder of each video, named by the video name without extension, or with the
+    extension if two videos have the same name
+
+    Returns
+    -------
+    folders : List
+    """
+
+    names = [os.path.splitext(os.path.basename(each))[0] for each in video_paths]
+    return [os.path.join(folder_path, name if names.count(name) == 1 else os.path.basename(path).replace('.', '_'))
+            for name, path in zip(names, video_paths)]
+
+
+def _init_worker():
+    # One video per core already, don't let OpenCV start more threads
+    cv2.setNumThreads(1)
+
+
+def process_video(video_path, folder_path, session, options):
+    """
+    Run a video in a worker process, the errors are returned in the summary instead of raised
+    so that one broken video doesn't stop the batch
+
+    Parameters
+    ----------
+    video_path : str
+    folder_path : str
+        Output folder of this video
+    session : dict
+        Parameters of the session, see MiTrace.io.session
+    options : dict
+        Other arguments of run_video
+
+    Returns
+    -------
+    summary : dict
+        Keys are SUMMARY_FIELDS
+    """
+
+    summary = {'video': video_path, 'status': 'done', 'frames': 0, 'seconds': 0.0, 'fps': 0.0,
+               'output': folder_path, 'error': ''}
+    start_time = time.time()
+    try:
+        _, trajectory = run_video(video_path=video_path, folder_path=folder_path, **options, **session)
+        summary['frames'] = int(trajectory.measured.sum())
+    except Exception as e:
+        summary['status'] = 'failed'
+        summary['error'] = f'{type(e).__name__}: {e}'
+
+    summary['seconds'] = round(time.time() - start_time, 2)
+    summary['fps'] = round(summary['frames'] / summary['seconds'], 1) if summary['seconds'] else 0.0
+
+    return summary
+
+
+def run_batch(video_paths, folder_path, session, jobs=None, **options):
+    """
+    Run the videos with the same session in a process pool, each process runs a whole video.
+    The results of each video are saved in its own folder, see output_folders, and a summary
+    of all the videos is saved into {folder_path}/batch_summary.csv
+
+    Parameters
+    ----------
+    video_paths : List
+    folder_path : str
+        Folder for the results
+    session : dict
+        Parameters of the session, see MiTrace.io.session
+    jobs : int, optional
+        Number of videos processed at the same time. Default is None, for the number of cores
+    options : dict
+        Other arguments of run_video, e.g. formats, queue_depth, checkpoint_interval, resume
+
+    Returns
+    -------
+    summaries : List
+        A dict for each video, in the order of video_paths
+    """
+
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+    jobs = max(1, min(jobs, len(video_paths)))
+
+    os.makedirs(folder_path, exist_ok=True)
+    folders = output_folders(video_paths, folder_path)
+
+    start_time = time.time()
+    summaries = [None] * len(video_paths)
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = {pool.submit(process_video, video_path, folder, session, options): idx
+                   for idx, (video_path, folder) in enumerate(zip(video_paths, folders))}
+        for done, future in enumerate(as_completed(futures), start=1):
+            summary = future.result()
+            summaries[futures[future]] = summary
+            print(f'[{done}/{len(video_paths)}] {os.path.basename(summary["video"])} {summary["status"]}, '
+                  f'{summary["frames"]} frames, {summary["fps"]} fps {summary["error"]}'.rstrip())
+    used = time.time() - start_time
+
+    with open(os.path.join(folder_path, 'batch_summary.csv'), 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=SUMMARY_FIELDS)
+        writer.writeheader()
+        writer.writerows(summaries)
+
+    frames = sum(each['frames'] for each in summaries)
+    failed = sum(each['status'] != 'done' for each in summaries)
+    print(f'Done! {len(summaries) - failed} of {len(summaries)} videos with {jobs} processes, '
+          f'{frames} frames in {round(used, 2)} seconds, {round(frames / used, 1) if used else 0} fps in total')
+
+    return summaries
@@ -0,0 +1,200 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: frame_reader.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 11:40
+@Description: Read frames from cv2.VideoCapture, in the current thread or decoded ahead by a reader thread
+"""
+import queue
+import threading
+
+import cv2
+import numpy as np
+
+
+def read_frames(cv_capture, n_frames=-1, stride=1):
+    """
+    Read frames one by one in the current thread
+
+    Parameters
+    ----------
+    cv_capture : cv2.VideoCapture object
+        capture object, already at the first frame to read
+    n_frames : int, optional
+        Number of frames to read. Default is -1, for reading to the end of video
+    stride : int, optional
+        Only decode every stride-th frame, the others are grabbed without decoding. Default is 1
+
+    Yields
+    ------
+    idx : int
+        Index of the frame from the first frame to read
+    frame : 3-D array
+    """
+
+    n = 0
+    while n_frames == -1 or n < n_frames:
+        if n % stride:
+            if not cv_capture.grab():
+                break
+        else:
+            ret, frame = cv_capture.read()
+            if not ret:
+                break
+            yield n, frame
+        n += 1
+
+
+class FrameReader:
+
+    def __init__(self, cv_capture, n_frames=-1, queue_depth=8, stride=1):
+        """
+        Decode frames ahead in a reader thread into a bounded queue of frame buffers, while the
+        consumer processes the previous frames. cv2.VideoCapture.read releases the GIL, so the
+        decode runs in parallel with the processing.
+
+        Iteration yields (idx, frame) like read_frames. The buffers are allocated once and recycled:
+        a frame yielded is only valid until the next frame is requested, copy it if it should be kept.
+
+        Parameters
+        ----------
+        cv_capture : cv2.VideoCapture object
+            capture object, already at the first frame to read
+        n_frames : int, optional
+            Number of frames to read. Default is -1, for reading to the end of video
+        queue_depth : int, optional
+            Number of decoded frames waiting for the consumer at most. Default is 8
+        stride : int, optional
+            Only decode every stride-th frame, the others are grabbed without decoding. Default is 1
+
+        """
+
+        self.cv_capture = cv_capture
+        self.n_frames = n_frames
+        self.queue_depth = max(1, queue_depth)
+        self.stride = max(1, stride)
+
+        # Decoded frames for the consumer, None is the end of video
+        self._full = queue.Queue(maxsize=self.queue_depth)
+        # Buffers to decode into: one per queue slot, one for the reader and one held by the consumer
+        self._free = queue.Queue()
+        width = int(cv_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cv_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        for _ in range(self.queue_depth + 2):
+            # read() allocates the buffer itself if the frame size is unknown
+            self._free.put(np.empty((height, width, 3), dtype=np.uint8) if width > 0 and height > 0 else None)
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+        # Counters for sizing the queue
+        self.frames = 0
+        # The consumer waited for a frame, decode is the bottleneck
+        self.consumer_stalls = 0
+        # The reader waited for a buffer, processing is the bottleneck
+        self.reader_stalls = 0
+        self._occupancy_sum = 0
+        self.max_occupancy = 0
+
+    def _run(self):
+        """
+        Reader thread, decode frames into the free buffers
+
+        Returns
+        -------
+
+        """
+
+        n = 0
+        try:
+            while not self._stop_event.is_set() and (self.n_frames == -1 or n < self.n_frames):
+                if n % self.stride:
+                    if not self.cv_capture.grab():
+                        break
+                    n += 1
+                    continue
+                if self._free.empty():
+                    self.reader_stalls += 1
+                buffer = self._free.get()
+                if self._stop_event.is_set():
+                    break
+                ret, frame = self.cv_capture.read(image=buffer)
+                if not ret:
+                    break
+                self._full.put((n, frame))
+                n += 1
+        finally:
+            self._full.put(None)
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """
+        Stop the reader thread, the frames decoded but not consumed are dropped
+
+        Returns
+        -------
+
+        """
+
+        self._stop_event.set()
+        # Unblock the reader if it is waiting for a buffer or a queue slot
+        self._free.put(None)
+        while self._thread.is_alive():
+            try:
+                self._full.get(timeout=0.05)
+            except queue.Empty:
+                pass
+        self._thread.join()
+
+    def __iter__(self):
+        if self._thread.ident is None:
+            self.start()
+
+        previous = None
+        while True:
+            # Give back the buffer of the previous frame
+            if previous is not None:
+                self._free.put(previous)
+                previous = None
+
+            occupancy = self._full.qsize()
+            self._occupancy_sum += occupancy
+            self.max_occupancy = max(self.max_occupancy, occupancy)
+            if occupancy == 0:
+                self.consumer_stalls += 1
+
+            item = self._full.get()
+            if item is None:
+                break
+            self.frames += 1
+            previous = item[1]
+            yield item
+
+    def stats(self):
+        """
+        Counters of the reader, for sizing the queue_depth
+
+        Returns
+        -------
+        stats : dict
+            frames : frames consumed
+            queue_depth : size of the queue
+            consumer_stalls : times the consumer waited for a decoded frame
+            reader_stalls : times the reader waited for a free buffer
+            mean_occupancy : mean number of frames in queue when the consumer asked for one
+            max_occupancy : max number of frames in queue when the consumer asked for one
+        """
+
+        return {
+            'frames': self.frames,
+            'queue_depth': self.queue_depth,
+            'consumer_stalls': self.consumer_stalls,
+            'reader_stalls': self.reader_stalls,
+            'mean_occupancy': round(self._occupancy_sum / max(1, self.frames + 1), 2),
+            'max_occupancy': self.max_occupancy,
+        }
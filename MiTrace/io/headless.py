@@ -0,0 +1,192 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: headless.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 10:30
+@Description: Run detection and analysis without any GUI, for servers without display
+"""
+import os
+
+import cv2
+
+from MiTrace.trace.analysis import Analysis, DEFAULT_FORMATS
+from MiTrace.trace.arena import make_arenas
+from MiTrace.trace.detection import Detection
+from MiTrace.trace.detectors import DEFAULT_DETECTOR
+from MiTrace.trace.heatmap import DEFAULT_BIN_SIZE, DEFAULT_SIGMA
+from MiTrace.trace.kinematics import DEFAULT_IMMOBILITY_SECONDS, DEFAULT_IMMOBILITY_SPEED
+from MiTrace.trace.parallel import detect_video_parallel
+from MiTrace.trace.roi import roi_name
+from MiTrace.utils.utils import crop_frame, decorate_image
+
+
+def run_video(video_path, folder_path, video_adjust=None, roi_lst=None, roi_name_lst=None,
+              threshold=30, start_frame=0, end_frame=-1, workers=1,
+              queue_depth=0, formats=DEFAULT_FORMATS, checkpoint_interval=0, resume=False,
+              memmap=False, frame_stride=1, search_radius=None, detector=DEFAULT_DETECTOR, timing=False,
+              arenas=None, heatmap_bin_size=DEFAULT_BIN_SIZE, heatmap_sigma=DEFAULT_SIGMA, figure_format='pdf',
+              fps=None, px_per_cm=None, immobility_speed=DEFAULT_IMMOBILITY_SPEED,
+              immobility_seconds=DEFAULT_IMMOBILITY_SECONDS, bin_seconds=None):
+    """
+    Detect a video and save the analysis results into a folder, no Qt or HighGUI is used
+
+    Parameters
+    ----------
+    video_path : str
+        Path of the video
+    folder_path : str
+        Folder to save results, will be created if not exist
+    video_adjust : List, optional
+        [x, y, width, height] for resize the video view. Default is None, for the whole frame
+    roi_lst : List, optional
+        rectangle [x, y, width, height], polygon or circle rois, see MiTrace.trace.roi
+    roi_name_lst : List, optional
+        Name of rois
+    threshold : int
+        Threshold for cv2.inRange
+    start_frame : int, optional
+        Detect video from which frame. Default is 0
+    end_frame : int, optional
+        End frame of frame detection. Default is -1, for no limit
+    workers : int, optional
+        Number of processes to detect the video, each one detects a segment of frames.
+        Default is 1, detect in the current process
+    queue_depth : int, optional
+        Decode frames ahead in a reader thread with a queue of this depth, only for workers == 1.
+        Default is 0, no reader thread
+    formats : List, optional
+        Formats of the result tables, in MiTrace.trace.analysis.RESULT_FORMATS. Default is DEFAULT_FORMATS
+    checkpoint_interval : int, optional
+        Flush the detection to {folder_path}/checkpoint.json every checkpoint_interval frames, only
+        for workers == 1. Default is 0, no checkpoint
+    resume : bool, optional
+        Resume from {folder_path}/checkpoint.json if it exists, only for workers == 1. Default is False
+    memmap : bool, optional
+        Store the trajectory in memory-mapped files in {folder_path}/trajectory, for very long
+        recordings, only for workers == 1. Default is False
+    frame_stride : int, optional
+        Only detect every frame_stride-th frame and interpolate the others. Default is 1
+    search_radius : int, optional
+        Search the object in a window of this half size around its predicted position, the whole
+        frame is searched if not found. Default is None, search the whole frame
+    detector : str, optional
+        Name of the detector in MiTrace.trace.detectors.DETECTORS. Default is 'contour'
+    timing : bool, optional
+        Time the stages of every frame and save them into {folder_path}/timing.csv, only for
+        workers == 1. Default is False
+    arenas : List, optional
+        Track several arenas from one decoding, see MiTrace.trace.arena. The results of each arena
+        are saved into {folder_path}/{arena name}, only for workers == 1. Default is None, a
+        single arena of the parameters above
+    heatmap_bin_size : int, optional
+        Pixels per bin of the heatmap, counted while detecting for workers == 1.
+        Default is DEFAULT_BIN_SIZE
+    heatmap_sigma : float, optional
+        Sigma of the gaussian smoothing of the heatmap in pixels. Default is DEFAULT_SIGMA
+    figure_format : str, optional
+        Format of the trace and heatmap figures, in MiTrace.trace.analysis.FIGURE_FORMATS. Default is 'pdf'
+    fps : float, optional
+        Frames per second for the kinematics. Default is None, cv2.CAP_PROP_FPS of the video
+    px_per_cm : float, optional
+        Pixels per centimeter, the kinematics are in centimeters. Default is None, in pixels
+    immobility_speed : float, optional
+        Speed under which the object is immobile, cm/s or px/s. Default is DEFAULT_IMMOBILITY_SPEED
+    immobility_seconds : float, optional
+        Shortest immobility bout. Default is DEFAULT_IMMOBILITY_SECONDS
+    bin_seconds : float, optional
+        Also summarize the distance and the roi occupancy by bins of this many seconds from
+        start_frame into the time_bins table, needs the frame rate. Default is None, no time bins
+
+    Returns
+    -------
+    info : str
+        Information returned by Detection.detect_video, and the table formats changed by
+        Analysis.save_results
+    trajectory : Trajectory
+        Trajectory of the object, of the first arena
+    """
+
+    if roi_lst is None:
+        roi_lst = []
+    if roi_name_lst is None:
+        roi_name_lst = [roi_name(each) for each in roi_lst]
+
+    cv_capture = cv2.VideoCapture(video_path)
+    if not cv_capture.isOpened():
+        raise IOError(f'Can not open video {video_path}')
+
+    # Some containers don't report the frame rate, no kinematics then
+    if not fps:
+        fps = cv_capture.get(cv2.CAP_PROP_FPS) or None
+
+    # The first frame is used for the calibration image
+    cv_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    success, first_image = cv_capture.read()
+    if not success:
+        cv_capture.release()
+        raise IOError(f'Can not read frame {start_frame} from video {video_path}')
+
+    # Didn't do the video resize, use the whole frame
+    if not video_adjust:
+        video_adjust = [0, 0, first_image.shape[1], first_image.shape[0]]
+    arenas = make_arenas(arenas, video_adjust=video_adjust, threshold=threshold, roi_lst=roi_lst,
+                         roi_name_lst=roi_name_lst)
+    if len(arenas) > 1 and workers > 1:
+        cv_capture.release()
+        raise ValueError('Several arenas are tracked from one decoding, only supported with workers == 1')
+    unsupported = [name for name, used in (('resume', resume), ('checkpoint_interval', checkpoint_interval > 0),
+                                           ('memmap', memmap), ('timing', timing),
+                                           ('queue_depth', queue_depth > 0)) if used]
+    if unsupported and workers > 1:
+        cv_capture.release()
+        raise ValueError(f'{", ".join(unsupported)} only supported with workers == 1')
+
+    os.makedirs(folder_path, exist_ok=True)
+    checkpoint_path = None
+    if checkpoint_interval > 0 or resume:
+        checkpoint_path = os.path.join(folder_path, 'checkpoint.json')
+
+    if workers > 1:
+        cv_capture.release()
+        trajectory, info = detect_video_parallel(video_path=video_path, video_adjust=arenas[0]['video_adjust'],
+                                                 start_frame=start_frame, end_frame=end_frame,
+                                                 threshold=arenas[0]['threshold'], n_workers=workers,
+                                                 frame_stride=frame_stride, search_radius=search_radius,
+                                                 detector=detector)
+        trajectories = [trajectory]
+        heatmaps = [None]
+    else:
+        detection = Detection(cv_capture=cv_capture, video_adjust=video_adjust, roi_lst=roi_lst,
+                              start_frame=start_frame, end_frame=end_frame, threshold=threshold,
+                              roi_name_lst=roi_name_lst, display=False, queue_depth=queue_depth,
+                              checkpoint_path=checkpoint_path, checkpoint_interval=checkpoint_interval or 1000,
+                              resume=resume, memmap_dir=os.path.join(folder_path, 'trajectory') if memmap else None,
+                              frame_stride=frame_stride, search_radius=search_radius, detector=detector,
+                              timing_path=os.path.join(folder_path, 'timing.csv') if timing else None,
+                              arenas=arenas, heatmap_bin_size=heatmap_bin_size)
+        info = detection.detect_video()
+        trajectories = detection.trajectories
+        heatmaps = detection.heatmaps
+
+    # One result set per arena
+    for arena, trajectory, heatmap in zip(arenas, trajectories, heatmaps):
+        arena_path = folder_path if len(arenas) == 1 else os.path.join(folder_path, arena['name'])
+        os.makedirs(arena_path, exist_ok=True)
+
+        analysis = Analysis(trajectory=trajectory, roi_lst=arena['roi_lst'],
+                            roi_name_lst=arena['roi_name_lst'], video_adjust=arena['video_adjust'],
+                            heatmap=heatmap, heatmap_bin_size=heatmap_bin_size, heatmap_sigma=heatmap_sigma,
+                            fps=fps, px_per_cm=px_per_cm, immobility_speed=immobility_speed,
+                            immobility_seconds=immobility_seconds, start_frame=start_frame,
+                            bin_seconds=bin_seconds)
+        notes = analysis.save_results(folder_path=arena_path, formats=formats, figure_format=figure_format)
+        if notes:
+            info = f'{info} {" ".join(notes)}'
+
+        image = decorate_image(crop_frame(first_image, arena['video_adjust']).copy(), arena['roi_lst'],
+                               arena['roi_name_lst'])
+        cv2.imwrite(filename=f'{arena_path}/img_for_calibration.png', img=image)
+
+    return info, trajectories[0]
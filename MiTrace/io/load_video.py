@@ -7,19 +7,76 @@
 @Date: 2024/1/26 15:20 
 @Description:  
 """
+import hashlib
+import json
 import os
 import sys
+import tempfile
 
 import cv2
 from PyQt5.QtCore import QCoreApplication, Qt, QStringListModel
 from PyQt5.QtGui import QImage, QPixmap
-from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QDialog
+from PyQt5.QtWidgets import QMainWindow, QApplication, QFileDialog, QDialog, QMessageBox
 
 from MiTrace.gui.image_dialog import Ui_image_dialog
 from MiTrace.gui.main import Ui_MiTrace
+from MiTrace.io.session import DEFAULT_SESSION, load_session, save_session
+from MiTrace.io.worker import DetectionWorker, PreviewSink
 from MiTrace.trace.analysis import Analysis
 from MiTrace.trace.detection import Detection
-from MiTrace.utils.utils import decorate_image
+from MiTrace.trace.heatmap import DEFAULT_BIN_SIZE
+from MiTrace.trace.preview import Preview
+from MiTrace.trace.threshold import ThresholdSamples, sample_frames
+from MiTrace.utils.utils import crop_frame, decorate_image
+
+# Result formats of each item in formatBox
+SAVE_FORMATS = [('parquet', 'npz'), ('csv',), ('xlsx',)]
+
+
+def checkpoint_path_of(video_path):
+    """
+    Checkpoint of a video run in the GUI, beside the video, or in the temporary folder when the
+    folder of the video is not writable, e.g. a read-only share
+
+    Parameters
+    ----------
+    video_path : str
+
+    Returns
+    -------
+    checkpoint_path : str
+    """
+
+    video_path = os.path.abspath(video_path)
+    name = f'{os.path.basename(video_path)}.checkpoint.json'
+    if os.access(os.path.dirname(video_path), os.W_OK):
+        return os.path.join(os.path.dirname(video_path), name)
+
+    # The hash of the path keeps the videos of the same name apart
+    folder = os.path.join(tempfile.gettempdir(), 'MiTrace')
+    os.makedirs(folder, exist_ok=True)
+
+    return os.path.join(folder, f'{hashlib.md5(video_path.encode()).hexdigest()[:8]}.{name}')
+
+
+def is_unfinished(checkpoint_path):
+    """
+    Whether a checkpoint exists and its detection was not finished, so it can be resumed
+
+    Parameters
+    ----------
+    checkpoint_path : str
+
+    Returns
+    -------
+    unfinished : bool
+    """
+
+    try:
+        with open(checkpoint_path, 'r', encoding='utf-8') as f:
+            return not json.load(f).get('finished', False)
+    except (OSError, ValueError):
+        return False
 
 
 class load_gui(QMainWindow, Ui_MiTrace):
@@ -45,6 +102,14 @@ class load_gui(QMainWindow, Ui_MiTrace):
 
         self.RunBt.clicked.connect(self.run)
 
+        # Detection runs in a worker thread, the preview is shown in the image label
+        self.worker = None
+        self.run_fps = 0
+        self.StopBt.setDisabled(True)
+        self.StopBt.clicked.connect(self.stop)
+        self.preview_sink = PreviewSink()
+        self.preview_sink.image.connect(self.show_preview)
+
         self.saveBt.setDisabled(True)
         self.saveBt.clicked.connect(self.save_results)
         self.first_image = None
@@ -60,6 +125,17 @@ class load_gui(QMainWindow, Ui_MiTrace):
         self.threshold = 30
         self.thresholdBt.clicked.connect(self.set_threshold)
         self.image_dialog = image_dialog(threshold=self.threshold)
+        # Frames sampled for the threshold dialog, kept until the video or the frame range changes
+        self.threshold_samples = None
+        self.threshold_samples_key = None
+
+        # Session file of the parameters, can be applied to a folder of videos by the command line
+        self.detector = DEFAULT_SESSION['detector']
+        self.px_per_cm = DEFAULT_SESSION['px_per_cm']
+        # Arenas of a session file, kept for saving it back, the GUI tracks a single arena
+        self.arenas = DEFAULT_SESSION['arenas']
+        self.saveSessionBt.clicked.connect(self.save_session)
+        self.loadSessionBt.clicked.connect(self.load_session)
 
     def load_video(self):
         """
@@ -233,12 +309,35 @@ class load_gui(QMainWindow, Ui_MiTrace):
 
         if self.detect_for_add_roi_set_threshold():
             self.image_dialog.show()
-            self.image_dialog.show_image(image=self.first_image,
-                                         threshold=self.threshold)
+            self.image_dialog.show_samples(samples=self.sample_for_threshold(),
+                                           threshold=self.threshold)
             self.image_dialog.exec()
             if self.image_dialog.ok:
                 self.threshold = self.image_dialog.threshold
 
+    def sample_for_threshold(self):
+        """
+        Frames spread across the range to detect, sampled and blurred once for the threshold dialog
+        Returns
+        -------
+        samples : ThresholdSamples
+
+        """
+
+        key = (self.video_path, str(self.video_adjust), self.startFrameEditor.value(), self.endFrameEditor.value())
+        if key != self.threshold_samples_key:
+            frame_indexes, frames = sample_frames(self.video_path, video_adjust=self.video_adjust,
+                                                  start_frame=key[2], end_frame=key[3])
+            if not frames:
+                # The video can't seek, use the first frame only
+                frame_indexes, frames = [0], [self.first_image]
+            self.threshold_samples = ThresholdSamples(frames, width=self.image_dialog.imageLabel.width(),
+                                                      height=self.image_dialog.imageLabel.height(),
+                                                      frame_indexes=frame_indexes)
+            self.threshold_samples_key = key
+
+        return self.threshold_samples
+
     def detect_for_add_roi_set_threshold(self):
         """
         Detection before add_roi and set_threshold
@@ -257,16 +356,29 @@ class load_gui(QMainWindow, Ui_MiTrace):
                 return True
         return True
 
+    def set_running(self, running):
+        """
+        Disable the controls while running, except the stop button
+        Returns
+        -------
+
+        """
+
+        for widget in (self.VideoPathBt, self.ResizeVideoBt, self.RunBt, self.saveBt, self.addROIBt,
+                       self.removeROIBt, self.thresholdBt, self.startFrameEditor, self.endFrameEditor,
+                       self.formatBox, self.ROIListView, self.saveSessionBt, self.loadSessionBt):
+            widget.setDisabled(running)
+        self.StopBt.setEnabled(running)
+
     def run(self):
         """
-        Run the detection and analysis, trigger by runBt
+        Run the detection and analysis in a worker thread, trigger by runBt
         Returns
         -------
 
         """
 
-        self.setDisabled(True)
-        self.StopBt.setEnabled(True)
+        self.set_running(True)
 
         self.statusLabel.setText('Running...')
         self.statusLabel.setStyleSheet('color:green')
@@ -278,29 +390,205 @@ class load_gui(QMainWindow, Ui_MiTrace):
         self.start_frame = self.startFrameEditor.value()
         self.end_frame = self.endFrameEditor.value()
 
+        # Checkpoint beside the video, resume from it if the last run was not finished
+        checkpoint_path = checkpoint_path_of(self.video_path)
+        resume = False
+        if is_unfinished(checkpoint_path):
+            resume = QMessageBox.question(self, 'Resume', 'A checkpoint of this video was found, resume from it?',
+                                          QMessageBox.Yes | QMessageBox.No) == QMessageBox.Yes
+
         self.detection = Detection(cv_capture=self.cv_capture, video_adjust=self.video_adjust,
                                    roi_lst=self.roi_lst, start_frame=self.start_frame,
                                    end_frame=self.end_frame, threshold=self.threshold,
-                                   roi_name_lst=self.roi_name_lst)
+                                   roi_name_lst=self.roi_name_lst, queue_depth=8,
+                                   checkpoint_path=checkpoint_path, resume=resume, display=False,
+                                   detector=self.detector, heatmap_bin_size=DEFAULT_BIN_SIZE,
+                                   preview=Preview(roi_lst=self.roi_lst, roi_name_lst=self.roi_name_lst,
+                                                   sink=self.preview_sink))
+
+        self.worker = DetectionWorker(detection=self.detection, roi_lst=self.roi_lst,
+                                      roi_name_lst=self.roi_name_lst, video_adjust=self.video_adjust,
+                                      video_fps=self.cv_capture.get(cv2.CAP_PROP_FPS) or None,
+                                      px_per_cm=self.px_per_cm)
+        self.run_fps = 0
+        self.worker.fps.connect(self.update_fps)
+        self.worker.progress.connect(self.show_progress)
+        self.worker.finished.connect(self.run_finished)
+        self.worker.failed.connect(self.run_failed)
+        self.worker.start()
+
+    def stop(self):
+        """
+        Stop the running detection, the frames detected are kept, trigger by StopBt
+        Returns
+        -------
+
+        """
+
+        if self.worker is not None:
+            self.StopBt.setDisabled(True)
+            self.statusLabel.setText('Stopping...')
+            self.worker.stop()
+
+    def show_progress(self, done, total):
+        """
+        Show the progress of the worker in the status label
+        Returns
+        -------
+
+        """
+
+        percent = f' ({done / total:.1%})' if total else ''
+        self.statusLabel.setText(f'Running... {done}/{total} frames{percent}, {self.run_fps:.0f} fps')
+
+    def update_fps(self, fps):
+        """
+        Frames per second of the worker, shown with the next progress
+        Returns
+        -------
+
+        """
+
+        self.run_fps = fps
+
+    def show_preview(self, image):
+        """
+        Show the preview of the detection in the image label
+        Returns
+        -------
+
+        """
+
+        self.imageLabel.setPixmap(QPixmap(image))
+
+    def run_failed(self, message):
+        """
+        The worker failed, show its error
+        Returns
+        -------
+
+        """
+
+        self.worker.wait()
+        self.worker = None
+        self.statusLabel.setText(f'Failed. {message}')
+        self.statusLabel.setStyleSheet("color: red")
+        self.cv_capture = cv2.VideoCapture(self.video_path)
+        self.set_running(False)
+
+    def run_finished(self, info):
+        """
+        The worker finished or was stopped, save the results
+        Returns
+        -------
+
+        """
 
-        info = self.detection.detect_video()
+        self.analysis = self.worker.analysis
+        self.worker.wait()
+        self.worker = None
 
-        self.analysis = Analysis(x_lst=self.detection.x_lst, y_lst=self.detection.y_lst,
-                                 roi_lst=self.roi_lst, roi_name_lst=self.roi_name_lst,
-                                 video_adjust=self.video_adjust)
+        # Nothing to resume after a finished run, the checkpoint is kept when stopped
+        if not self.detection.stop_requested:
+            for checkpoint in self.detection.checkpoints:
+                checkpoint.remove()
 
         self.statusLabel.setText(info)
         self.statusLabel.setStyleSheet('color:green')
+        self.set_running(False)
+        # Save first, the image is only set by Resize or Add ROI
         self.save_results()
+        if self.first_image is not None:
+            self.update_image()
 
         # Finish detection
         # self.VideoPathEditor.setText("")
-        self.cv_capture.release()
-        cv2.destroyAllWindows()
         self.cv_capture = cv2.VideoCapture(self.video_path)
-        self.setDisabled(False)
         self.saveBt.setEnabled(True)
 
+    def save_session(self):
+        """
+        Save the parameters into a session file, trigger by saveSessionBt
+        Returns
+        -------
+
+        """
+
+        path_, _ = QFileDialog.getSaveFileName(self, 'Save the session', '', 'Session File (*.json)')
+        if path_ == '':
+            return
+
+        # The end frame of the whole video is saved as -1, so the session fits the other videos
+        end_frame = self.endFrameEditor.value()
+        save_session(path_, {
+            'video_adjust': self.video_adjust if self.video_adjust != [0, 0, -1, -1] else None,
+            'roi_lst': self.roi_lst,
+            'roi_name_lst': self.roi_name_lst,
+            'threshold': self.threshold,
+            'start_frame': self.startFrameEditor.value(),
+            'end_frame': -1 if end_frame == self.frame_count else end_frame,
+            'detector': self.detector,
+            'px_per_cm': self.px_per_cm,
+            'arenas': self.arenas,
+        })
+        self.statusLabel.setText(f'Session saved to {path_}')
+        self.statusLabel.setStyleSheet('color:green')
+
+    def load_session(self):
+        """
+        Load the parameters from a session file, trigger by loadSessionBt
+        Returns
+        -------
+
+        """
+
+        path_, _ = QFileDialog.getOpenFileName(self, 'Load a session', '', 'Session File (*.json)')
+        if path_ == '':
+            return
+
+        try:
+            session = load_session(path_)
+        except (ValueError, OSError) as e:
+            self.statusLabel.setText(str(e))
+            self.statusLabel.setStyleSheet('color: red')
+            return
+
+        self.video_adjust = session['video_adjust']
+        self.roi_lst = session['roi_lst']
+        self.roi_name_lst = session['roi_name_lst']
+        self.threshold = session['threshold']
+        self.detector = session['detector']
+        self.px_per_cm = session['px_per_cm']
+        self.arenas = session['arenas']
+        self.startFrameEditor.setValue(session['start_frame'])
+        self.endFrameEditor.setValue(self.frame_count if session['end_frame'] == -1 else session['end_frame'])
+
+        # Show the rois on the first frame cropped by the session
+        if self.cv_capture is not None:
+            success, image = cv2.VideoCapture(self.video_path).read()
+            if success:
+                self.first_image = crop_frame(image, self.video_adjust).copy()
+                self.refresh_listview()
+        if self.arenas:
+            self.statusLabel.setText(f'Session loaded from {path_}, its {len(self.arenas)} arenas are kept for '
+                                     f'saving but only run by the command line, the GUI tracks the session crop')
+            self.statusLabel.setStyleSheet('color: orange')
+        else:
+            self.statusLabel.setText(f'Session loaded from {path_}')
+            self.statusLabel.setStyleSheet('color:green')
+
+    def closeEvent(self, event):
+        """
+        Stop the running detection before closing, the checkpoint is kept for resuming
+        :param event: QCloseEvent
+        :return:
+        """
+
+        if self.worker is not None:
+            self.worker.stop()
+            self.worker.wait()
+        event.accept()
+
     def save_results(self):
         """
         Save results analyzed
@@ -313,9 +601,20 @@ class load_gui(QMainWindow, Ui_MiTrace):
         if path_ == '':
             return
 
-        self.analysis.save_results(folder_path=path_)
-        image = decorate_image(self.first_image, self.roi_lst, self.roi_name_lst)
-        cv2.imwrite(filename=f'{path_}/img_for_calibration.png', img=image)
+        notes = self.analysis.save_results(folder_path=path_, formats=SAVE_FORMATS[self.formatBox.currentIndex()])
+        if notes:
+            self.statusLabel.setText(f'{self.statusLabel.text()} {" ".join(notes)}')
+        image = self.first_image
+        if image is None:
+            # Run without Resize or Add ROI, take the first frame detected
+            cv_capture = cv2.VideoCapture(self.video_path)
+            cv_capture.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
+            success, frame = cv_capture.read()
+            cv_capture.release()
+            image = crop_frame(frame, self.video_adjust).copy() if success else None
+        if image is not None:
+            image = decorate_image(image, self.roi_lst, self.roi_name_lst)
+            cv2.imwrite(filename=f'{path_}/img_for_calibration.png', img=image)
 
 
 class image_dialog(QDialog, Ui_image_dialog):
@@ -334,7 +633,7 @@ class image_dialog(QDialog, Ui_image_dialog):
 
         self.setupUi(self)
         self.thresholdEditor.valueChanged.connect(self.refresh_image)
-        self.image_blur = None
+        self.samples = None
         self.threshold = threshold
         self.ok = False
         self.okBt.clicked.connect(self.ok_press)
@@ -342,7 +641,7 @@ class image_dialog(QDialog, Ui_image_dialog):
 
     def show_image(self, image, threshold):
         """
-        Display the image
+        Display a single image
 
         Parameters
         ----------
@@ -354,33 +653,49 @@ class image_dialog(QDialog, Ui_image_dialog):
         -------
 
         """
-        self.threshold = threshold
-        # This sentence put here will raise the
-        # error: (-215:Assertion failed) ! _src.empty() in function 'cv::inRange'
-        # And I really don't know why
-        # self.thresholdEditor.setValue(self.threshold)
 
-        image_gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-        self.image_blur = cv2.GaussianBlur(image_gray, (7, 7), 5, 5)
-        self.thresholdEditor.setValue(self.threshold)
+        self.show_samples(ThresholdSamples([image]), threshold)
+
+    def show_samples(self, samples, threshold):
+        """
+        Display the frames sampled from the video and the area of each one in the range
+
+        Parameters
+        ----------
+        samples : ThresholdSamples
+            Sampled frames, blurred and downscaled already
+        threshold : int
+            Same with self.threshold
+        Returns
+        -------
+
+        """
+
+        self.samples = samples
+        # setValue doesn't emit valueChanged for the same threshold, refresh once by hand
+        self.thresholdEditor.blockSignals(True)
+        self.thresholdEditor.setValue(threshold)
+        self.thresholdEditor.blockSignals(False)
+        self.refresh_image()
 
     def refresh_image(self):
         """
-        If the threshold change, refresh the image
+        If the threshold change, refresh the image, only a lookup table on the downscaled samples
         Returns
         -------
 
         """
         self.threshold = int(self.thresholdEditor.value())
-        image = cv2.inRange(self.image_blur, 0, self.threshold)
-        self.imageLabel.setMinimumWidth(image.shape[1])
-        self.imageLabel.setMinimumHeight(image.shape[0])
+        if self.samples is None:
+            return
 
-        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
-        image = QImage(image.data, image.shape[1], image.shape[0], image.shape[1] * 3,
-                       QImage.Format_RGB888)
-        image = QPixmap(image)
-        self.imageLabel.setPixmap(image)
+        image = self.samples.preview(self.threshold)
+        self.imageLabel.setPixmap(QPixmap.fromImage(
+            QImage(image.data, image.shape[1], image.shape[0], image.shape[1], QImage.Format_Grayscale8)))
+
+        image = self.samples.histogram(self.threshold, self.histLabel.width(), self.histLabel.height())
+        self.histLabel.setPixmap(QPixmap.fromImage(
+            QImage(image.data, image.shape[1], image.shape[0], image.shape[1], QImage.Format_Grayscale8)))
 
     def ok_press(self):
         """
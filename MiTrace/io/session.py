@@ -0,0 +1,80 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: session.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 10:30
+@Description: Load and save the tracking parameters of a session as a JSON file
+"""
+import json
+
+from MiTrace.trace.detectors import DEFAULT_DETECTOR
+from MiTrace.trace.roi import roi_name
+
+# Parameters of a session, same with the arguments of Detection
+DEFAULT_SESSION = {
+    'video_adjust': None,
+    'roi_lst': [],
+    'roi_name_lst': [],
+    'threshold': 30,
+    'start_frame': 0,
+    'end_frame': -1,
+    'detector': DEFAULT_DETECTOR,
+    'arenas': None,
+    'px_per_cm': None,
+}
+
+
+def load_session(path):
+    """
+    Load a session file, the missing parameters are filled with the default value
+
+    Parameters
+    ----------
+    path : str
+        Path of the JSON session file
+
+    Returns
+    -------
+    session : dict
+        Parameters of the session, keys are the same with DEFAULT_SESSION
+    """
+
+    with open(path, 'r', encoding='utf-8') as f:
+        content = json.load(f)
+
+    unknown = set(content) - set(DEFAULT_SESSION)
+    if unknown:
+        raise ValueError(f'Unknown parameters in session file {path}: {sorted(unknown)}')
+
+    session = dict(DEFAULT_SESSION)
+    session.update(content)
+
+    # Name the unnamed rois like the GUI does
+    if len(session['roi_name_lst']) < len(session['roi_lst']):
+        session['roi_name_lst'] = list(session['roi_name_lst']) + \
+                                  [roi_name(each) for each in session['roi_lst'][len(session['roi_name_lst']):]]
+
+    return session
+
+
+def save_session(path, session):
+    """
+    Save the parameters of a session into a JSON file
+
+    Parameters
+    ----------
+    path : str
+        Path of the JSON session file
+    session : dict
+        Parameters of the session, keys are the same with DEFAULT_SESSION
+
+    Returns
+    -------
+
+    """
+
+    content = {key: session.get(key, value) for key, value in DEFAULT_SESSION.items()}
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(content, f, indent=4)
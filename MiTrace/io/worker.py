@@ -0,0 +1,134 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: worker.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 19:10
+@Description: Run the detection in a QThread, report the progress and the preview by signals
+"""
+import cv2
+from PyQt5.QtCore import QObject, Qt, QThread, pyqtSignal, pyqtSlot
+from PyQt5.QtGui import QImage
+
+from MiTrace.trace.analysis import Analysis
+
+
+class PreviewSink(QObject):
+    """
+    Sink of MiTrace.trace.preview.Preview, emit the preview frame as a QImage to the GUI thread
+    """
+
+    image = pyqtSignal(QImage)
+
+    # Signals can be emitted from the render thread
+    thread_safe = True
+
+    def show(self, frame, frame_thresh):
+        frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+        image = QImage(frame.data, frame.shape[1], frame.shape[0], frame.shape[1] * 3, QImage.Format_RGB888)
+        # Copy, the array is freed after returning
+        self.image.emit(image.copy())
+
+        return True
+
+    def close(self):
+        pass
+
+
+class DetectionWorker(QObject):
+    """
+    Run Detection.detect_video and build the Analysis out of the GUI thread, use start() to
+    run it in its own QThread
+    """
+
+    progress = pyqtSignal(int, int)
+    fps = pyqtSignal(float)
+    finished = pyqtSignal(str)
+    failed = pyqtSignal(str)
+
+    def __init__(self, detection, roi_lst, roi_name_lst, video_adjust, video_fps=None, px_per_cm=None):
+        """
+        Parameters
+        ----------
+        detection : Detection
+            Detection to run, its progress_callback is replaced
+        roi_lst, roi_name_lst, video_adjust : List
+            For the Analysis
+        video_fps, px_per_cm : float, optional
+            Frame rate of the video and calibration, for the kinematics of the Analysis
+
+        """
+
+        super().__init__()
+        self.detection = detection
+        self.detection.progress_callback = self._report
+        self.roi_lst = roi_lst
+        self.roi_name_lst = roi_name_lst
+        self.video_adjust = video_adjust
+        # Not self.fps, that's the signal of the detection speed
+        self.video_fps = video_fps
+        self.px_per_cm = px_per_cm
+        self.analysis = None
+        self.thread = None
+
+    def start(self):
+        """
+        Move to a new QThread and run in it
+
+        Returns
+        -------
+
+        """
+
+        self.thread = QThread()
+        self.moveToThread(self.thread)
+        self.thread.started.connect(self.run)
+        # Quit directly from the worker thread, so wait() in a slot of finished doesn't block
+        self.finished.connect(self.thread.quit, Qt.DirectConnection)
+        self.failed.connect(self.thread.quit, Qt.DirectConnection)
+        self.thread.start()
+
+    def wait(self):
+        """
+        Wait until the thread quits
+
+        Returns
+        -------
+
+        """
+
+        if self.thread is not None:
+            self.thread.wait()
+
+    def stop(self):
+        """
+        Stop after the current frame, the trajectory detected so far is analyzed
+
+        Returns
+        -------
+
+        """
+
+        self.detection.stop()
+
+    @pyqtSlot()
+    def run(self):
+        # Any error is reported by failed, an exception escaping a slot aborts PyQt5 and the GUI
+        # would keep waiting, e.g. a checkpoint made with different parameters, or not writable
+        try:
+            info = self.detection.detect_video()
+            if self.detection.stop_requested:
+                info = f'Stopped. {info}'
+            self.analysis = Analysis(trajectory=self.detection.trajectory, roi_lst=self.roi_lst,
+                                     roi_name_lst=self.roi_name_lst, video_adjust=self.video_adjust,
+                                     heatmap=self.detection.heatmap, fps=self.video_fps, px_per_cm=self.px_per_cm)
+        except Exception as e:
+            self.failed.emit(f'{type(e).__name__}: {e}')
+            return
+
+        self.finished.emit(info)
+
+    def _report(self, done, total, fps):
+        self.fps.emit(fps)
+        self.progress.emit(done, total)
@@ -8,19 +8,83 @@
 @Description:  Analysis the results from detection, maily a x_list and y_lst
 """
 import numpy as np
-import pandas as pd
-import matplotlib.pyplot as plt
-from scipy.ndimage import gaussian_filter
+
+from MiTrace.trace.heatmap import DEFAULT_BIN_SIZE, DEFAULT_SIGMA, OccupancyGrid
+from MiTrace.trace.kinematics import DEFAULT_IMMOBILITY_SECONDS, DEFAULT_IMMOBILITY_SPEED, Kinematics
+from MiTrace.trace.roi import RoiIndex
+from MiTrace.utils.utils import decimate_path, true_runs
+
+# Formats of the result tables, Excel is slow and limited in rows, only for short recordings
+RESULT_FORMATS = ('parquet', 'npz', 'csv', 'xlsx')
+DEFAULT_FORMATS = ('parquet', 'npz')
+EXCEL_MAX_ROWS = 1048576
+
+# pandas and matplotlib are imported by the methods using them, they take most of the startup time
+
+# Formats of the figures, the trace is rasterized in the pdf
+FIGURE_FORMATS = ('pdf', 'png')
+FIGURE_DPI = 200
+
+# The trace plotted deviates at most this many pixels from the positions, with at most this many points
+DEFAULT_TRACE_EPSILON = 1.0
+DEFAULT_TRACE_POINTS = 100000
+
+
+def step_distances(x_arr, y_arr):
+    """
+    Euclidean distance to each position from the previous one, the first is zero
+
+    Parameters
+    ----------
+    x_arr, y_arr : Array
+
+    Returns
+    -------
+    distance : Array
+        float64, rounded to 4 decimals
+    """
+
+    distance = np.zeros(len(x_arr), dtype=np.float64)
+    if len(x_arr) > 1:
+        distance[1:] = np.hypot(np.diff(x_arr), np.diff(y_arr))
+        np.round(distance, 4, out=distance)
+
+    return distance
+
+
+def unique_names(names):
+    """
+    Names made unique for columns, a repeated name is suffixed with its position from 1
+
+    Parameters
+    ----------
+    names : List
+
+    Returns
+    -------
+    names : List
+    """
+
+    repeated = {name for name in names if list(names).count(name) > 1}
+
+    return [f'{name} #{idx + 1}' if name in repeated else name for idx, name in enumerate(names)]
 
 
 class Analysis:
 
-    def __init__(self, x_lst=None, y_lst=None, video_adjust=None, roi_lst=None, roi_name_lst=None):
+    def __init__(self, x_lst=None, y_lst=None, video_adjust=None, roi_lst=None, roi_name_lst=None,
+                 trajectory=None, heatmap=None, heatmap_bin_size=DEFAULT_BIN_SIZE, heatmap_sigma=DEFAULT_SIGMA,
+                 trace_epsilon=DEFAULT_TRACE_EPSILON, trace_max_points=DEFAULT_TRACE_POINTS, fps=None, px_per_cm=None,
+                 immobility_speed=DEFAULT_IMMOBILITY_SPEED, immobility_seconds=DEFAULT_IMMOBILITY_SECONDS,
+                 start_frame=0, bin_seconds=None):
         """
-        Analyze the results of detection, based on the x_lst and y_lst
+        Analyze the results of detection, based on the x_lst and y_lst, or the trajectory
         1. Result sheet
-        2. Trace scatter plot
-        3. Trace heatmap
+        2. Roi occupancy summary
+        3. Trace scatter plot
+        4. Trace heatmap
+        5. Kinematics and immobility bouts, with the frame rate
+        6. Distance and roi occupancy by time bins, with the frame rate and bin_seconds
 
         Parameters
         ----------
@@ -31,22 +95,90 @@ class Analysis:
         video_adjust : List
             resize the video
         roi_lst : List
-            A list of rois
+            A list of rois, rectangle [x, y, width, height], polygon or circle, see MiTrace.trace.roi
         roi_name_lst : List
             A list of rois' name
+        trajectory : Trajectory, optional
+            Trajectory from Detection, x_lst and y_lst are taken from it, and the result sheet
+            reports whether the object was detected in each frame
+        heatmap : OccupancyGrid, optional
+            Occupancy grid accumulated by Detection, its size is also the size of the plots.
+            Default is None, counted from x_lst and y_lst
+        heatmap_bin_size : int, optional
+            Pixels per bin of the heatmap counted here. Default is DEFAULT_BIN_SIZE
+        heatmap_sigma : float, optional
+            Sigma of the gaussian smoothing of the heatmap in pixels. Default is DEFAULT_SIGMA
+        trace_epsilon : float, optional
+            The trace plot is simplified by at most this many pixels, see decimate_path.
+            Default is DEFAULT_TRACE_EPSILON, 0 for plotting every position
+        trace_max_points : int, optional
+            At most this many points are plotted in the trace plot, for long recordings.
+            Default is DEFAULT_TRACE_POINTS, None for no limit
+        fps : float, optional
+            Frames per second of the video, for the kinematics, see MiTrace.trace.kinematics.
+            Default is None, no kinematics
+        px_per_cm : float, optional
+            Pixels per centimeter, the kinematics are in centimeters. Default is None, in pixels
+        immobility_speed : float, optional
+            Speed under which the object is immobile, in cm/s, or px/s without px_per_cm.
+            Default is DEFAULT_IMMOBILITY_SPEED
+        immobility_seconds : float, optional
+            Shortest immobility bout in seconds. Default is DEFAULT_IMMOBILITY_SECONDS
+        start_frame : int, optional
+            First frame detected, the time bins start from it, and the frames are counted from it
+            without a trajectory. Default is 0
+        bin_seconds : float, optional
+            Summarize by bins of this many seconds, see get_time_bins, needs fps. Default is None,
+            no time bins
         """
 
         if video_adjust is None:
             video_adjust = [1, 1, 10, 10]
 
+        if trajectory is not None:
+            x_lst = trajectory.x
+            y_lst = trajectory.y
+
         self.video_adjust = video_adjust
-        self.x_lst = x_lst
-        self.y_lst = y_lst
+        self.trajectory = trajectory
+        self.x_lst = np.asarray(x_lst) if x_lst is not None else None
+        self.y_lst = np.asarray(y_lst) if y_lst is not None else None
         self.roi_lst = roi_lst
         self.roi_name_lst = roi_name_lst
         self.video_adjust = video_adjust
         self.result_df = None
         self.roi_map = None
+        self.roi_index = None
+        self.roi_labels = None
+        self.roi_summary = None
+        self.heatmap = heatmap
+        self.heatmap_bin_size = heatmap_bin_size
+        self.heatmap_sigma = heatmap_sigma
+        self.trace_epsilon = trace_epsilon
+        self.trace_max_points = trace_max_points
+        self.fps = fps
+        self.px_per_cm = px_per_cm
+        self.immobility_speed = immobility_speed
+        self.immobility_seconds = immobility_seconds
+        self.kinematics = None
+        self.start_frame = start_frame
+        self.bin_seconds = bin_seconds
+        self.time_bins = None
+
+    def get_frames(self):
+        """
+        Frame of each position in the video
+
+        Returns
+        -------
+        frame : Array
+            From the trajectory, or counted from start_frame without it
+        """
+
+        if self.trajectory is not None:
+            return self.trajectory.frame
+
+        return self.start_frame + np.arange(len(self.x_lst))
 
     def get_result_sheet(self):
         """
@@ -55,33 +187,45 @@ class Analysis:
         | frame | x_coordinate | y_coordinate | distance |
         |   1   |     383      |      27      |    0     |
 
+        frame is the frame of the video, see get_frames. With a trajectory, detected (False for the frames filled with the previous position), the
+        area of object and measured (False for the frames interpolated) are added. With the frame
+        rate, the time in seconds, the smoothed position, speed, acceleration, heading and
+        immobile of MiTrace.trace.kinematics are added, in centimeters with px_per_cm
+
         Returns
         -------
         result_df : DataFrame
             dataframe of x/y coordinates and distance
         """
-        # result_df = pd.DataFrame(columns=['x_coordinate', 'y_coordinate', 'distance'])
-        # result_df['x_coordinate'] = self.x_lst
-        # result_df['y_coordinate'] = self.y_lst
 
-        distance_lst = []
-        for i in range(1, len(self.x_lst)):
-            # Use Euclidean distance
-            distance_lst.append(round(np.sqrt((self.y_lst[i] - self.y_lst[i - 1]) ** 2
-                                              + (self.x_lst[i] - self.x_lst[i - 1]) ** 2), 4))
+        import pandas as pd
+
+        x_arr = self.x_lst
+        y_arr = self.y_lst
 
-        # Pad a zero before distance_lst which is the first distance
-        distance_lst = [0] + distance_lst
+        # Use Euclidean distance, the first distance is zero
+        distance = step_distances(x_arr, y_arr)
 
-        # distance_lst = np.pad(np.array(distance_lst), (0, len(self.x_lst)-len(distance_lst)))
-        # result_df['distance'] = distance_lst
+        self.result_df = pd.DataFrame({
+            'frame': self.get_frames(),
+            'x_coordinate': x_arr,
+            'y_coordinate': y_arr,
+            'distance': distance
+        })
+        if self.trajectory is not None:
+            self.result_df['detected'] = self.trajectory.valid
+            self.result_df['area'] = self.trajectory.area
+            self.result_df['measured'] = self.trajectory.measured
 
-        self.result_df = pd.DataFrame.from_dict({
-            'frame': range(len(self.x_lst)),
-            'x_coordinate': self.x_lst,
-            'y_coordinate': self.y_lst,
-            'distance': distance_lst
-        }, orient='index').transpose()
+        if self.fps:
+            kinematics = self.get_kinematics()
+            self.result_df['time'] = kinematics.time
+            self.result_df['x_smoothed'] = kinematics.x.astype(np.float32)
+            self.result_df['y_smoothed'] = kinematics.y.astype(np.float32)
+            self.result_df['speed'] = kinematics.speed.astype(np.float32)
+            self.result_df['acceleration'] = kinematics.acceleration.astype(np.float32)
+            self.result_df['heading'] = kinematics.heading.astype(np.float32)
+            self.result_df['immobile'] = kinematics.immobile
 
     def analyze_roi(self):
         """
@@ -98,31 +242,210 @@ class Analysis:
 
         """
 
-        self.result_df['roi'] = self.result_df.apply(self.roi_locate, axis=1)
+        import pandas as pd
+
+        roi_lst = self.roi_lst or []
+        roi_name_lst = self.roi_name_lst or []
+
+        # Rasterize the rois once, then locate all the frames by indexing
+        self.roi_labels = self.get_roi_index().locate(self.result_df['x_coordinate'].to_numpy(),
+                                                self.result_df['y_coordinate'].to_numpy())
+        names = np.array([''] + list(roi_name_lst), dtype=object)
+        self.result_df['roi'] = names[self.roi_labels]
 
         self.roi_map = pd.DataFrame(columns=['roi name', 'roi position'])
-        self.roi_map['roi name'] = self.roi_name_lst
-        self.roi_map['roi position'] = self.roi_lst
+        self.roi_map['roi name'] = roi_name_lst
+        self.roi_map['roi position'] = [str(each) for each in roi_lst]
 
-    def roi_locate(self, row):
+    def get_roi_index(self):
         """
-        Pass in a (x, y) coordinate, and determine the position is in the roi list or not.
-        If 'yes' return the roi's name, if 'not' return empty
+        Rois rasterized for locating the positions
+
+        Returns
+        -------
+        roi_index : RoiIndex
+        """
+
+        if self.roi_index is None:
+            self.roi_index = RoiIndex(self.roi_lst or [], width=max(0, self.video_adjust[2]),
+                                      height=max(0, self.video_adjust[3]))
+
+        return self.roi_index
+
+    def get_roi_summary(self):
+        """
+        Summarize the occupancy of each roi, from the run-length encoding of the frames in the roi.
+        A frame in overlapping rois counts for all of them.
+        | roi name | entries | exits | dwell frames | dwell ratio | first entry frame | mean bout frames | max bout frames |
+        |  center  |    12   |   11  |      5230    |    0.2092   |         37        |      435.8333    |       1580      |
+
+        A bout is a run of continuous frames in the roi, entries is the number of bouts (the
+        first frame counts as an entry if the object is already in the roi), exits is the number
+        of bouts ended before the last frame. The first entry frame is the frame of the video, empty
+        if never entered.
+
+        Returns
+        -------
+
+        """
+
+        import pandas as pd
+
+        roi_lst = self.roi_lst or []
+        roi_name_lst = self.roi_name_lst or []
+        n_frames = len(self.result_df)
+
+        member = self.roi_index.membership(self.result_df['x_coordinate'].to_numpy(),
+                                           self.result_df['y_coordinate'].to_numpy())
+        frame = self.result_df['frame'].to_numpy()
+
+        rows = []
+        for idx in range(len(roi_lst)):
+            starts, lengths = true_runs(member[:, idx])
+            dwell = int(lengths.sum())
+            rows.append({
+                'roi name': roi_name_lst[idx],
+                'entries': len(starts),
+                'exits': int(np.count_nonzero(starts + lengths < n_frames)),
+                'dwell frames': dwell,
+                'dwell ratio': round(dwell / n_frames, 4) if n_frames else 0,
+                'first entry frame': int(frame[starts[0]]) if len(starts) else None,
+                'mean bout frames': round(float(lengths.mean()), 4) if len(starts) else 0,
+                'max bout frames': int(lengths.max()) if len(starts) else 0,
+            })
+
+        self.roi_summary = pd.DataFrame(rows, columns=['roi name', 'entries', 'exits', 'dwell frames',
+                                                       'dwell ratio', 'first entry frame',
+                                                       'mean bout frames', 'max bout frames'])
+
+    def get_kinematics(self):
+        """
+        Kinematics of the positions, needs the frame rate
+
+        Returns
+        -------
+        kinematics : Kinematics
+        """
+
+        if self.kinematics is None:
+            self.kinematics = Kinematics(self.x_lst, self.y_lst, fps=self.fps, px_per_cm=self.px_per_cm,
+                                         frame=self.get_frames(),
+                                         immobility_speed=self.immobility_speed,
+                                         immobility_seconds=self.immobility_seconds)
+
+        return self.kinematics
+
+    def get_time_bins(self):
+        """
+        Summarize the frames by bins of bin_seconds from start_frame, from the arrays directly, each
+        quantity is a single np.bincount or np.add.reduceat over the bin index of the frames.
+        | bin | start frame | start time | end time | frames | distance | smoothed distance | mean speed | immobile time | center time | center entries |
+        |  0  |      0      |    0.0     |   60.0   |  1800  | 541.0216 |     523.1432      |   8.7191   |     12.4      |     21.3    |       4        |
+
+        Times are in seconds of the video, the last bin can be shorter. distance is the sum of the
+        distance column of the result sheet in pixels, so the bins add up to it. smoothed distance
+        and mean speed are from the smoothed positions of the kinematics, in centimeters with
+        px_per_cm. detected ratio is added with a trajectory. For each roi, the time in it and the
+        entries in the bin are added, an entry is the first frame of a bout in the roi, same with
+        get_roi_summary. A roi name used twice is suffixed with its position, e.g. 'center #2'
 
-        Parameters
-        ----------
-        Row of self.result_df
         Returns
         -------
+        time_bins : DataFrame
+        """
+
+        import pandas as pd
+
+        if not self.fps:
+            raise ValueError('The frame rate is needed for the time bins')
+        if not self.bin_seconds or self.bin_seconds <= 0:
+            raise ValueError(f'The bin should be positive, got {self.bin_seconds} seconds')
+
+        kinematics = self.get_kinematics()
+        n_frames = len(kinematics.x)
+        frame = self.get_frames()
+
+        # Bin of each frame, the frames are in order
+        bin_idx = ((frame - self.start_frame) // (self.bin_seconds * self.fps)).astype(np.int64)
+        n_bins = int(bin_idx[-1]) + 1 if n_frames else 0
+        bin_starts = np.searchsorted(bin_idx, np.arange(n_bins))
+        frames = np.bincount(bin_idx, minlength=n_bins)
+
+        # Step to each frame from the previous one, counted in the bin of the frame
+        steps = step_distances(self.x_lst, self.y_lst)
+        smoothed_steps = np.zeros(n_frames, dtype=np.float64)
+        if n_frames > 1:
+            smoothed_steps[1:] = np.hypot(np.diff(kinematics.x), np.diff(kinematics.y))
+
+        start_time = self.start_frame / self.fps + np.arange(n_bins) * self.bin_seconds
+        columns = {
+            'bin': np.arange(n_bins),
+            'start frame': frame[bin_starts] if n_frames else np.zeros(0, dtype=np.int64),
+            'start time': np.round(start_time, 4),
+            'end time': np.round(np.minimum(start_time + self.bin_seconds,
+                                            (frame[-1] + 1) / self.fps if n_frames else 0), 4),
+            'frames': frames,
+            'distance': np.round(np.bincount(bin_idx, weights=steps, minlength=n_bins), 4),
+            'smoothed distance': np.round(np.bincount(bin_idx, weights=smoothed_steps, minlength=n_bins), 4),
+            'mean speed': np.round(np.bincount(bin_idx, weights=kinematics.speed, minlength=n_bins)
+                                   / np.maximum(frames, 1), 4),
+            'immobile time': np.round(np.bincount(bin_idx, weights=kinematics.immobile, minlength=n_bins)
+                                      / self.fps, 4),
+        }
+        if self.trajectory is not None:
+            columns['detected ratio'] = np.round(np.bincount(bin_idx, weights=self.trajectory.valid, minlength=n_bins)
+                                                 / np.maximum(frames, 1), 4)
 
+        # Frames in each roi by bin, the empty bins take the next bin's first row in reduceat
+        roi_name_lst = self.roi_name_lst or []
+        if roi_name_lst and n_frames:
+            member = self.get_roi_index().membership(self.x_lst, self.y_lst)
+            in_roi = np.add.reduceat(member.astype(np.int64), bin_starts, axis=0)
+            in_roi[frames == 0] = 0
+            for idx, name in enumerate(unique_names(roi_name_lst)):
+                starts, _ = true_runs(member[:, idx])
+                columns[f'{name} time'] = np.round(in_roi[:, idx] / self.fps, 4)
+                columns[f'{name} entries'] = np.bincount(bin_idx[starts], minlength=n_bins)
+
+        self.time_bins = pd.DataFrame(columns)
+
+        return self.time_bins
+
+    def frame_size(self):
+        """
+        Size of the frames the positions are in, from the heatmap accumulated, or video_adjust.
+        For video_adjust [0, 0, -1, -1] without a heatmap, the extent of the positions
+
+        Returns
+        -------
+        width, height : int
         """
-        x = row['x_coordinate']
-        y = row['y_coordinate']
-        for idx, roi in enumerate(self.roi_lst):
-            if roi[0] < x < roi[0]+roi[2] and roi[1] < y < roi[1] + roi[3]:
-                return self.roi_name_lst[idx]
 
-        return ''
+        if self.heatmap is not None:
+            return self.heatmap.width, self.heatmap.height
+
+        width, height = self.video_adjust[2], self.video_adjust[3]
+        if width <= 0 or height <= 0:
+            width = int(self.x_lst.max()) + 1 if len(self.x_lst) else 1
+            height = int(self.y_lst.max()) + 1 if len(self.y_lst) else 1
+
+        return width, height
+
+    def get_heatmap(self):
+        """
+        Occupancy grid of the positions, the one accumulated by Detection if given
+
+        Returns
+        -------
+        heatmap : OccupancyGrid
+        """
+
+        if self.heatmap is None:
+            width, height = self.frame_size()
+            self.heatmap = OccupancyGrid.from_positions(self.x_lst, self.y_lst, width=width, height=height,
+                                                        bin_size=self.heatmap_bin_size)
+
+        return self.heatmap
 
     def get_trace_plot(self):
         """
@@ -133,45 +456,160 @@ class Analysis:
             Figure contains trace plot
         """
 
+        import matplotlib.pyplot as plt
+
+        width, height = self.frame_size()
+
         fig_trace, ax_trace = plt.subplots(nrows=1, ncols=1)
         ax_trace.set_aspect(1)  # Set the x and y coordinate bin equal
-        ax_trace.set_xlim([0, self.video_adjust[2]])
-        ax_trace.set_ylim([0, self.video_adjust[3]])
-        ax_trace.plot(self.x_lst, self.y_lst, lw=1, c='k')
+        ax_trace.set_xlim([0, width])
+        ax_trace.set_ylim([0, height])
+        # The positions simplified, drawn as an image in the pdf, so the size of the figure doesn't
+        # grow with the recording
+        x_lst, y_lst = decimate_path(self.x_lst, self.y_lst, epsilon=self.trace_epsilon,
+                                     max_points=self.trace_max_points)
+        ax_trace.plot(x_lst, y_lst, lw=1, c='k', rasterized=True)
         # Move the ticks to the top
         ax_trace.tick_params(top=True, labeltop=True, bottom=False, labelbottom=False)
         ax_trace.invert_yaxis()
 
+        # The grid has a bin per heatmap_bin_size pixels, the first row on the top
+        heatmap = self.get_heatmap()
         fig_heatmap, ax_heatmap = plt.subplots(nrows=1, ncols=1)
-        heatmap, x_edge, y_edge = np.histogram2d(self.x_lst, self.y_lst,
-                                                 bins=max(self.video_adjust[2], self.video_adjust[3]),
-                                                 range=[[0, self.video_adjust[2]], [0, self.video_adjust[3]]])
-        heatmap = gaussian_filter(heatmap, 6)
-        heatmap = heatmap.T
-        heatmap = heatmap[::-1, ]
-        extent = [x_edge[0], x_edge[-1], y_edge[0], y_edge[-1]]
         # Move the ticks to the top
         ax_heatmap.tick_params(top=True, labeltop=True, bottom=False, labelbottom=False)
-        im = ax_heatmap.imshow(heatmap, cmap=plt.cm.jet, extent=extent)
+        im = ax_heatmap.imshow(heatmap.smoothed(self.heatmap_sigma), cmap=plt.cm.jet, extent=heatmap.extent,
+                               origin='upper')
         fig_heatmap.colorbar(im, ax=ax_heatmap)
-        ax_heatmap.invert_yaxis()
 
         return fig_trace, fig_heatmap
 
-    def save_results(self, folder_path):
+    def get_result_tables(self):
+        """
+        Tables to be saved, the name is used as the sheet name or the file name. With the frame
+        rate, the kinematics summary and the immobility bouts are added, and the time bins if made
+
+        Returns
+        -------
+        tables : dict
+            {name: DataFrame}
+        """
+
+        tables = {
+            'trace_result': self.result_df,
+            'roi_map': self.roi_map,
+            'roi_summary': self.roi_summary,
+        }
+        if self.fps:
+            import pandas as pd
+
+            kinematics = self.get_kinematics()
+            tables['kinematics_summary'] = pd.DataFrame([kinematics.summary()])
+            tables['immobility_bouts'] = pd.DataFrame(kinematics.bouts())
+        if self.time_bins is not None:
+            tables['time_bins'] = self.time_bins
+
+        return tables
+
+    def save_tables(self, folder_path, formats=DEFAULT_FORMATS):
+        """
+        Save the result tables in the formats selected
+        parquet : {name}.parquet, zstd compressed
+        npz : trace_result.npz, compressed raw arrays of frame, x, y, distance and roi label
+        csv : {name}.csv, written by chunks
+        xlsx : result.xlsx, a sheet for each table. An Excel sheet holds 1048576 rows, the tables
+               are saved as csv instead for longer recordings
+
+        Parameters
+        ----------
+        folder_path : str
+            Folder to save the tables
+        formats : List, optional
+            Formats in RESULT_FORMATS. Default is DEFAULT_FORMATS
+
+        Returns
+        -------
+        notes : List
+            Messages of the formats changed, empty if saved as asked
+        """
+
+        unknown = set(formats) - set(RESULT_FORMATS)
+        if unknown:
+            raise ValueError(f'Unknown result formats {sorted(unknown)}, should be in {RESULT_FORMATS}')
+
+        tables = self.get_result_tables()
+
+        notes = []
+        # The header takes a row of the sheet
+        too_long = [name for name, table in tables.items() if len(table) >= EXCEL_MAX_ROWS]
+        if 'xlsx' in formats and too_long:
+            formats = [each for each in formats if each != 'xlsx'] + ([] if 'csv' in formats else ['csv'])
+            notes.append(f'{", ".join(too_long)} too long for Excel, saved as csv instead of result.xlsx')
+
+        if 'parquet' in formats:
+            for name, table in tables.items():
+                table.to_parquet(f'{folder_path}/{name}.parquet', compression='zstd', index=False)
+
+        if 'npz' in formats:
+            np.savez_compressed(f'{folder_path}/trace_result.npz',
+                                frame=self.result_df['frame'].to_numpy(),
+                                x_coordinate=self.result_df['x_coordinate'].to_numpy(),
+                                y_coordinate=self.result_df['y_coordinate'].to_numpy(),
+                                distance=self.result_df['distance'].to_numpy(),
+                                roi_label=self.roi_labels,
+                                roi_name=np.array([''] + list(self.roi_name_lst or []), dtype=str))
+
+        if 'csv' in formats:
+            for name, table in tables.items():
+                table.to_csv(f'{folder_path}/{name}.csv', index=False, chunksize=100000)
+
+        if 'xlsx' in formats:
+            import pandas as pd
+
+            with pd.ExcelWriter(f'{folder_path}/result.xlsx') as writer:
+                for name, table in tables.items():
+                    table.to_excel(writer, sheet_name=name, index=False)
+
+        return notes
+
+    def save_results(self, folder_path, formats=DEFAULT_FORMATS, figure_format='pdf'):
         """
         Save results
+
+        Parameters
+        ----------
+        folder_path : str
+            Folder to save the results
+        formats : List, optional
+            Formats of the result tables, see save_tables. Default is DEFAULT_FORMATS
+        figure_format : str, optional
+            Format of the figures in FIGURE_FORMATS. Default is 'pdf'
+
         Returns
         -------
+        notes : List
+            Messages of the table formats changed, see save_tables
 
         """
 
+        import matplotlib.pyplot as plt
+
+        if figure_format not in FIGURE_FORMATS:
+            raise ValueError(f'Unknown figure format {figure_format}, should be in {FIGURE_FORMATS}')
+
         self.get_result_sheet()
         self.analyze_roi()
+        self.get_roi_summary()
+        if self.bin_seconds:
+            self.get_time_bins()
         fig_trace, fig_heatmap = self.get_trace_plot()
 
-        with pd.ExcelWriter(f'{folder_path}/result.xlsx') as writer:
-            self.result_df.to_excel(writer, sheet_name='trace_result', index=False)
-            self.roi_map.to_excel(writer, sheet_name='roi_map', index=False)
-        fig_trace.savefig(f'{folder_path}/trace_figure.pdf')
-        fig_heatmap.savefig(f'{folder_path}/heatmap_figure.pdf')
+        notes = self.save_tables(folder_path=folder_path, formats=formats)
+        # Rasterize a dense trace by chunks, Agg overflows on a noisy one otherwise
+        with plt.rc_context({'agg.path.chunksize': 10000}):
+            fig_trace.savefig(f'{folder_path}/trace_figure.{figure_format}', dpi=FIGURE_DPI)
+            fig_heatmap.savefig(f'{folder_path}/heatmap_figure.{figure_format}', dpi=FIGURE_DPI)
+        plt.close(fig_trace)
+        plt.close(fig_heatmap)
+
+        return notes
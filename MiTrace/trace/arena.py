@@ -0,0 +1,74 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: arena.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 20:10
+@Description: Arenas of a video, each one is tracked independently from the same decoded frames
+"""
+from MiTrace.trace.roi import roi_name
+
+# An arena is a dict of
+#     name : str, name of the arena, also the name of its result folder
+#     video_adjust : [x, y, width, height], crop of the arena in the frame
+#     threshold : int, threshold for cv2.inRange
+#     roi_lst : List, rois in the coordinates of the crop
+#     roi_name_lst : List, names of the rois
+# The missing keys are filled with the parameters of the detection, roi_name_lst only with its roi_lst
+ARENA_KEYS = ('name', 'video_adjust', 'threshold', 'roi_lst', 'roi_name_lst')
+
+
+def make_arenas(arenas, video_adjust, threshold=30, roi_lst=None, roi_name_lst=None):
+    """
+    Complete the arenas with the parameters of the detection
+
+    Parameters
+    ----------
+    arenas : List
+        A list of arena dicts, see ARENA_KEYS. None or empty for a single arena of the parameters
+    video_adjust : List
+    threshold : int, optional
+    roi_lst : List, optional
+    roi_name_lst : List, optional
+
+    Returns
+    -------
+    arenas : List
+        A list of complete arena dicts
+    """
+
+    if not arenas:
+        arenas = [{}]
+
+    result = []
+    for idx, arena in enumerate(arenas):
+        unknown = set(arena) - set(ARENA_KEYS)
+        if unknown:
+            raise ValueError(f'Unknown keys of arena {idx + 1}: {sorted(unknown)}')
+
+        # The names of the detection only go with its rois
+        if 'roi_lst' in arena:
+            default_names = []
+        else:
+            default_names = roi_name_lst or []
+        each = {
+            'name': str(arena.get('name', f'arena{idx + 1}')),
+            'video_adjust': list(arena['video_adjust']) if arena.get('video_adjust') else video_adjust,
+            'threshold': arena.get('threshold', threshold),
+            'roi_lst': list(arena.get('roi_lst', roi_lst or [])),
+            'roi_name_lst': list(arena.get('roi_name_lst', default_names)),
+        }
+        # Name the unnamed rois like the GUI does
+        each['roi_name_lst'] += [roi_name(roi) for roi in each['roi_lst'][len(each['roi_name_lst']):]]
+        # Checked before the detection, Analysis fails on it after
+        if len(each['roi_name_lst']) != len(each['roi_lst']):
+            raise ValueError(f'Arena {each["name"]} has {len(each["roi_lst"])} rois but '
+                             f'{len(each["roi_name_lst"])} roi names')
+        result.append(each)
+
+    names = [each['name'] for each in result]
+    if len(set(names)) != len(names):
+        raise ValueError(f'The names of the arenas should be unique, got {names}')
+
+    return result
@@ -0,0 +1,167 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: checkpoint.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 14:10
+@Description: Checkpoint of detection, flush the trajectory by chunks and resume from it
+"""
+import json
+import os
+
+import numpy as np
+
+from MiTrace.trace.trajectory import TRAJECTORY_FIELDS
+
+# Record of a frame in the trajectory file
+CHECKPOINT_DTYPE = np.dtype([(name, np.dtype(dtype).newbyteorder('<'))
+                             for name, dtype in TRAJECTORY_FIELDS.items()])
+CHECKPOINT_VERSION = 3
+
+
+class Checkpoint:
+
+    def __init__(self, path, parameters, interval=1000):
+        """
+        Checkpoint of a detection, two files are written
+        {path} : JSON state, frames flushed, next frame to read, last valid position and parameters
+        {path}.bin : trajectory, appended by chunks of CHECKPOINT_DTYPE records
+
+        The state is replaced atomically after the trajectory chunk is written, so the checkpoint
+        is consistent even if the process is killed while flushing.
+
+        Parameters
+        ----------
+        path : str
+            Path of the checkpoint state file
+        parameters : dict
+            Parameters of the detection, a checkpoint can only be resumed with the same parameters
+        interval : int, optional
+            Flush every interval frames. Default is 1000
+
+        """
+
+        self.path = path
+        self.data_path = f'{path}.bin'
+        self.parameters = json.loads(json.dumps(parameters))
+        self.interval = max(1, interval)
+
+        # Number of frames in the trajectory file
+        self.frames = 0
+
+    def exists(self):
+        return os.path.exists(self.path) and os.path.exists(self.data_path)
+
+    def state(self):
+        """
+        Read and check the state of the checkpoint
+
+        Returns
+        -------
+        state : dict
+        """
+
+        with open(self.path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        if state.get('version') != CHECKPOINT_VERSION:
+            raise ValueError(f'Checkpoint {self.path} is of version {state.get("version")}, '
+                             f'expected {CHECKPOINT_VERSION}')
+        if state['parameters'] != self.parameters:
+            raise ValueError(f'Checkpoint {self.path} was made with different parameters: '
+                             f'{state["parameters"]}, now {self.parameters}')
+
+        return state
+
+    def load(self, next_frame=None):
+        """
+        Load the checkpoint for resuming
+
+        Parameters
+        ----------
+        next_frame : int, optional
+            Rewind to this frame, the records of the frames from it are dropped. Used to align
+            several checkpoints saved together. Default is None, the next frame of the state
+
+        Returns
+        -------
+        state : dict
+            State of the checkpoint
+        records : Array
+            Trajectory flushed, structured array of CHECKPOINT_DTYPE
+        """
+
+        state = self.state()
+
+        # Drop the records written after the last state, if killed while flushing
+        self.frames = state['frames']
+        with open(self.data_path, 'r+b') as f:
+            f.truncate(self.frames * CHECKPOINT_DTYPE.itemsize)
+        records = np.fromfile(self.data_path, dtype=CHECKPOINT_DTYPE)
+
+        if next_frame is not None and next_frame < state['next_frame']:
+            self.frames = int(np.searchsorted(records['frame'], next_frame))
+            records = records[:self.frames]
+            with open(self.data_path, 'r+b') as f:
+                f.truncate(self.frames * CHECKPOINT_DTYPE.itemsize)
+            state['next_frame'] = next_frame
+            state['finished'] = False
+
+        return state, records
+
+    def save(self, trajectory, next_frame, last_position, finished=False):
+        """
+        Append the frames not flushed yet to the trajectory file, then update the state
+
+        Parameters
+        ----------
+        trajectory : Trajectory
+            The whole trajectory, only the frames after self.frames are written
+        next_frame : int
+            Frame index of the video to read when resuming
+        last_position : tuple
+            (x, y) of the last detected position, used for the missed detections after resuming
+        finished : bool, optional
+            The detection reached end_frame or the end of video
+
+        Returns
+        -------
+
+        """
+
+        records = np.empty(len(trajectory) - self.frames, dtype=CHECKPOINT_DTYPE)
+        for name in CHECKPOINT_DTYPE.names:
+            records[name] = trajectory[name][self.frames:]
+
+        mode = 'ab' if self.frames else 'wb'
+        with open(self.data_path, mode) as f:
+            records.tofile(f)
+            f.flush()
+            os.fsync(f.fileno())
+        self.frames = len(trajectory)
+
+        state = {
+            'version': CHECKPOINT_VERSION,
+            'frames': self.frames,
+            'next_frame': int(next_frame),
+            'last_position': [int(last_position[0]), int(last_position[1])],
+            'finished': finished,
+            'parameters': self.parameters,
+        }
+        with open(f'{self.path}.tmp', 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=4)
+        os.replace(f'{self.path}.tmp', self.path)
+
+    def remove(self):
+        """
+        Remove the checkpoint files
+
+        Returns
+        -------
+
+        """
+
+        for path in (self.path, self.data_path):
+            if os.path.exists(path):
+                os.remove(path)
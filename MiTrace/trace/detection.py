@@ -8,16 +8,34 @@
 @Description:  
 """
 
-import cv2
+import os
 import time
 
-from MiTrace.utils.utils import frame_producer, detect_frame, drawTrackLine, decorate_image
+import cv2
+
+from MiTrace.io.frame_reader import FrameReader, read_frames
+from MiTrace.trace.arena import make_arenas
+from MiTrace.trace.checkpoint import Checkpoint
+from MiTrace.trace.detectors import DEFAULT_DETECTOR
+from MiTrace.trace.heatmap import OccupancyGrid
+from MiTrace.trace.preview import Preview
+from MiTrace.trace.timing import StageTimer
+from MiTrace.trace.tracking import Tracker
+from MiTrace.trace.trajectory import Trajectory
+from MiTrace.utils.utils import crop_size
+
+# Frames of the trajectory counted into the heatmap at a time
+HEATMAP_CHUNK = 4096
 
 
 class Detection:
 
     def __init__(self, cv_capture, video_adjust=None, roi_lst=None, start_frame=0, end_frame=-1,
-                 threshold=30, roi_name_lst=None):
+                 threshold=30, roi_name_lst=None, display=True, queue_depth=0, checkpoint_path=None,
+                 checkpoint_interval=1000, resume=False, memmap_dir=None, frame_stride=1,
+                 search_radius=None, detector=DEFAULT_DETECTOR, timing=False, timing_path=None,
+                 preview_rate=10, preview=None, progress_callback=None, arenas=None,
+                 heatmap_bin_size=None):
         """
         Detect the object with white-balance threshold frame by frame, analyze the result
 
@@ -37,6 +55,55 @@ class Detection:
             Threshold for cv2.inRange
         roi_name_lst : List
             Name of rois
+        display : bool, optional
+            Show the tracking windows with cv2.imshow while detecting, drawn by a preview thread at
+            preview_rate and shown from the detection loop. Set False for headless runs, no HighGUI
+            function will be called. Default is True
+        queue_depth : int, optional
+            Decode frames ahead in a reader thread, at most queue_depth frames are waiting for
+            processing. Default is 0, read the frames in the detection loop
+        checkpoint_path : str, optional
+            Flush the trajectory and the state of detection to this checkpoint periodically, and
+            when stopped by ESC or an error. Default is None, no checkpoint
+        checkpoint_interval : int, optional
+            Flush the checkpoint every checkpoint_interval frames. Default is 1000
+        resume : bool, optional
+            Resume from the checkpoint if it exists, the video is continued from the frame after
+            the checkpoint. Default is False
+        memmap_dir : str, optional
+            Store the trajectory in memory-mapped files in this folder, for very long recordings.
+            Default is None, in the memory
+        frame_stride : int, optional
+            Only detect every frame_stride-th frame, the skipped frames are grabbed without decoding
+            and their positions are interpolated at the end. Default is 1, detect every frame
+        search_radius : int, optional
+            Only search a window of this half size around the position predicted from the last
+            detections, the whole frame is searched when the object is not in the window.
+            Default is None, search the whole frame every frame
+        detector : str, optional
+            Name of the detector in MiTrace.trace.detectors.DETECTORS. Default is 'contour'
+        timing : bool, optional
+            Time every stage of the loop for every frame, the breakdown is added to the returned
+            information. Default is False
+        timing_path : str, optional
+            Also save the time of every frame into this csv file, implies timing. Default is None
+        preview_rate : float, optional
+            Preview per second shown when display, the frames in between are not drawn.
+            Default is 10, 0 for every frame
+        preview : Preview, optional
+            Use this preview instead of the cv2.imshow windows, e.g. with another sink.
+            Default is None
+        progress_callback : callable, optional
+            Called about twice per second from the detection loop with (frames done, frames in
+            total, frames per second). Default is None
+        arenas : List, optional
+            Track several arenas of the video from the same decoded frames, each one with its own
+            crop, threshold and rois, see MiTrace.trace.arena. The missing keys are filled with the
+            parameters above. The preview shows the first arena. Default is None, a single arena
+        heatmap_bin_size : int, optional
+            Count the positions of each arena into an occupancy grid with bins of this size while
+            detecting, by chunks of HEATMAP_CHUNK frames, the grids are in self.heatmaps when
+            finished. Default is None, no grid
 
         """
 
@@ -50,17 +117,117 @@ class Detection:
         # cv capture from the start frame
         self.cv_capture.set(cv2.CAP_PROP_POS_FRAMES, self.start_frame)
 
+        # Arenas tracked from the same frames, each one has its own tracker, trajectory and checkpoint
+        self.arenas = make_arenas(arenas, video_adjust=video_adjust, threshold=threshold, roi_lst=roi_lst,
+                                  roi_name_lst=roi_name_lst)
+
         # Adjust (resize) the view of video, [x, y, width, height], can be select manually
-        self.video_adjust = video_adjust
+        self.video_adjust = self.arenas[0]['video_adjust']
         self.roi_lst = roi_lst
         self.roi_name_lst = roi_name_lst
 
         # Threshold of object
-        self.threshold = threshold
+        self.threshold = self.arenas[0]['threshold']
+
+        # Time of the stages of every frame, does nothing if not enabled
+        self.timing_path = timing_path
+        self.timer = StageTimer(enabled=timing or timing_path is not None)
+
+        # Locate the object frame by frame
+        self.trackers = [Tracker(video_adjust=arena['video_adjust'], threshold=arena['threshold'],
+                                 search_radius=search_radius, detector=detector, timer=self.timer)
+                         for arena in self.arenas]
+
+        # Show the tracking windows or not, rendered by the preview thread
+        self.display = display
+        self.preview = preview
+        if self.preview is None and display:
+            self.preview = Preview(roi_lst=self.arenas[0]['roi_lst'], roi_name_lst=self.arenas[0]['roi_name_lst'],
+                                   rate=preview_rate)
+
+        # Reader thread for decoding ahead, the stall and occupancy counters are in self.reader.stats()
+        self.queue_depth = queue_depth
+        self.reader = None
+
+        # Progress reporting and cooperative stop, stop() can be called from any thread
+        self.progress_callback = progress_callback
+        self.progress_interval = 0.5
+        self.stop_requested = False
+
+        # Detect every frame_stride-th frame, interpolate the others
+        self.frame_stride = max(1, frame_stride)
+
+        # results position of objects, in {memmap_dir}/{arena name} for several arenas
+        self.memmap_dir = memmap_dir
+        self.trajectories = [Trajectory(memmap_dir=self._arena_path(memmap_dir, idx)) for idx in range(len(self.arenas))]
+
+        # Occupancy grid of each arena, made when the detection starts
+        self.heatmap_bin_size = heatmap_bin_size
+        self.heatmaps = []
+
+        # Checkpoint can only be resumed with the same parameters and video,
+        # {checkpoint_path} for the first arena, {root}.{arena name}{ext} for the others
+        self.checkpoints = []
+        self.resume = resume
+        if checkpoint_path:
+            root, ext = os.path.splitext(checkpoint_path)
+            for idx, arena in enumerate(self.arenas):
+                self.checkpoints.append(Checkpoint(
+                    path=checkpoint_path if idx == 0 else f'{root}.{arena["name"]}{ext}',
+                    interval=checkpoint_interval, parameters={
+                        'video_adjust': list(arena['video_adjust']),
+                        'threshold': arena['threshold'],
+                        'start_frame': start_frame,
+                        'end_frame': end_frame,
+                        'frame_count': int(cv_capture.get(cv2.CAP_PROP_FRAME_COUNT)),
+                        'frame_stride': self.frame_stride,
+                        'detector': detector if isinstance(detector, str) else detector.__name__,
+                    }))
+
+    def _arena_path(self, path, idx):
+        """
+        Folder of an arena in path, path itself for a single arena
+        """
+
+        if path is None or len(self.arenas) == 1:
+            return path
+
+        return os.path.join(path, self.arenas[idx]['name'])
+
+    @property
+    def tracker(self):
+        return self.trackers[0]
 
-        # results position of objects
-        self.x_lst = []
-        self.y_lst = []
+    @property
+    def trajectory(self):
+        return self.trajectories[0]
+
+    @property
+    def heatmap(self):
+        return self.heatmaps[0] if self.heatmaps else None
+
+    @property
+    def checkpoint(self):
+        return self.checkpoints[0] if self.checkpoints else None
+
+    @property
+    def x_lst(self):
+        return self.trajectory.x
+
+    @property
+    def y_lst(self):
+        return self.trajectory.y
+
+    def stop(self):
+        """
+        Ask detect_video to stop after the current frame, the trajectory detected is kept
+
+        Returns
+        -------
+
+        """
+
+        self.stop_requested = True
 
     def detect_video(self):
         """
@@ -70,54 +237,160 @@ class Detection:
 
         """
 
-        # If no x and y were detected, use the most previous one
-        temp_x = 0
-        temp_y = 0
+        # If no x and y were detected, use the most previous one, for each arena
+        last_positions = [(0, 0)] * len(self.arenas)
+
+        next_frame = self.start_frame
+        finished = False
+        if self.resume and self.checkpoints and all(each.exists() for each in self.checkpoints):
+            # Continue all the arenas from the earliest frame, if killed between saving them
+            states = [each.state() for each in self.checkpoints]
+            next_frame = min(state['next_frame'] for state in states)
+            finished = all(state['finished'] for state in states)
+            for idx, checkpoint in enumerate(self.checkpoints):
+                state, records = checkpoint.load(next_frame=next_frame)
+                self.trajectories[idx].extend(x=records['x'], y=records['y'], frame=records['frame'],
+                                              valid=records['valid'], area=records['area'],
+                                              measured=records['measured'])
+                # The positions recorded are filled, the last one is the last valid position
+                last_positions[idx] = (int(records['x'][-1]), int(records['y'][-1])) if len(records) \
+                    else tuple(state['last_position'])
+            self.cv_capture.set(cv2.CAP_PROP_POS_FRAMES, next_frame)
+
+        n_frames = -1 if self.end_frame == -1 else max(0, self.end_frame - next_frame)
+        if not self.cv_capture.isOpened() or finished:
+            n_frames = 0
+
+        # Decode ahead in a reader thread, or read frame by frame in this loop
+        if self.queue_depth > 0:
+            self.reader = FrameReader(cv_capture=self.cv_capture, n_frames=n_frames,
+                                      queue_depth=self.queue_depth, stride=self.frame_stride).start()
+            frames = self.reader
+        else:
+            frames = read_frames(cv_capture=self.cv_capture, n_frames=n_frames, stride=self.frame_stride)
 
-        frame_counter = self.start_frame
+        if self.heatmap_bin_size:
+            # Size of the crops, also for video_adjust [0, 0, -1, -1]
+            frame_width = int(self.cv_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+            frame_height = int(self.cv_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            self.heatmaps = [OccupancyGrid(*crop_size(frame_width, frame_height, arena['video_adjust']),
+                                           bin_size=self.heatmap_bin_size) for arena in self.arenas]
+
+        if self.preview is not None:
+            self.preview.start()
 
-        ret = self.cv_capture.isOpened()
         start_time = time.time()
+        first_frame = next_frame
+        self.timer.mark()
+
+        # End of the range, an end_frame after the end of the video is cut to it
+        frame_count = int(self.cv_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+        last_frame = self.end_frame if self.end_frame != -1 else frame_count
+        if frame_count > 0:
+            last_frame = min(last_frame, frame_count)
+        total_frames = max(0, last_frame - self.start_frame)
+        next_report = time.perf_counter() + self.progress_interval
+
+        try:
+            for idx, frame in frames:
+                self.timer.lap('decode')
+                frame_idx = first_frame + idx
+                next_frame = frame_idx + self.frame_stride
 
-        while ret:
-            if self.end_frame != -1 and frame_counter >= self.end_frame:
-                break
-            frame_counter += 1
+                for arena_idx, tracker in enumerate(self.trackers):
+                    arena_frame, frame_thresh, detected = tracker.locate(original_frame=frame)
+                    x, y, area = detected.x, detected.y, detected.area
 
-            # ret is a boolean represent whether the read() function is done successfully
-            ret, frame = self.cv_capture.read()
-            if ret:
-                frame, frame_thresh = frame_producer(original_frame=frame, resize=self.video_adjust,
-                                                     threshold=self.threshold)
-                cv2.imshow('Threshold', frame_thresh)
+                    valid = x != -1
+                    if valid:
+                        last_positions[arena_idx] = (x, y)
+                    else:
+                        x, y = last_positions[arena_idx]
+                        area = 0
 
-                x, y, contour = detect_frame(frame=frame_thresh)
+                    self.trajectories[arena_idx].append(frame_idx, x, y, valid, area)
 
-                if x != -1:
-                    temp_x = x
-                    temp_y = y
-                if x == -1:
-                    x = temp_x
-                    y = temp_y
+                    # The preview shows the first arena
+                    if arena_idx == 0:
+                        preview_state = (arena_frame, frame_thresh, x, y, detected.contour)
 
-                self.x_lst.append(x)
-                self.y_lst.append(y)
+                if self.checkpoints and \
+                        len(self.trajectory) - self.checkpoint.frames >= self.checkpoint.interval:
+                    for arena_idx, checkpoint in enumerate(self.checkpoints):
+                        checkpoint.save(self.trajectories[arena_idx], next_frame, last_positions[arena_idx])
+                if self.heatmaps and len(self.trajectory) - self.heatmap.frames >= HEATMAP_CHUNK:
+                    for arena_idx, heatmap in enumerate(self.heatmaps):
+                        heatmap.update(self.trajectories[arena_idx])
+                self.timer.lap('record')
 
-                cv2.circle(frame, (x, y), 3, (255, 255, 255), -1)
-                cv2.drawContours(frame, contour, -1, (255, 255, 255), 2)
-                drawTrackLine(frame, self.x_lst, self.y_lst, 80)
+                if self.preview is not None:
+                    self.preview.record(*preview_state[2:4])
+                    if self.preview.due():
+                        self.preview.submit(*preview_state)
+                    # The windows of a sink which is not thread-safe are shown from this thread
+                    self.preview.poll()
+                    self.timer.lap('preview')
+                    if self.preview.stop_requested:
+                        self.stop_requested = True
 
-                frame = decorate_image(frame, self.roi_lst, self.roi_name_lst)
+                self.timer.next_frame(frame_idx)
 
-                cv2.imshow('Original video roi', frame)
+                if self.progress_callback is not None and time.perf_counter() >= next_report:
+                    next_report = time.perf_counter() + self.progress_interval
+                    self.progress_callback(min(frame_idx + 1 - self.start_frame, total_frames), total_frames,
+                                           (idx // self.frame_stride + 1) / max(time.time() - start_time, 1e-6))
 
-            if cv2.waitKey(1) & 0xFF == 27:
-                break
+                if self.stop_requested:
+                    break
+            else:
+                finished = True
+        finally:
+            if self.reader is not None:
+                self.reader.stop()
+            if self.preview is not None:
+                self.preview.stop()
+            # Keep the work done, also when stopped by ESC or an error
+            for arena_idx, checkpoint in enumerate(self.checkpoints):
+                checkpoint.save(self.trajectories[arena_idx], next_frame, last_positions[arena_idx],
+                                finished=finished)
+            for trajectory in self.trajectories:
+                trajectory.flush()
+
+        # Rebuild the full-rate trajectory from the frames detected. When read to the end, the
+        # frames after the last detected one hold its position, so there is a row for every frame
+        if self.frame_stride > 1:
+            for idx, trajectory in enumerate(self.trajectories):
+                end = min(last_frame - 1, trajectory.frame[-1] + self.frame_stride - 1) \
+                    if finished and len(trajectory) else None
+                self.trajectories[idx] = trajectory.interpolated(memmap_dir=self._arena_path(
+                    os.path.join(self.memmap_dir, 'interpolated') if self.memmap_dir else None, idx), last_frame=end)
+            # The interpolated frames are counted too
+            for heatmap in self.heatmaps:
+                heatmap.reset()
+        for arena_idx, heatmap in enumerate(self.heatmaps):
+            heatmap.update(self.trajectories[arena_idx])
 
         # detection finish
         self.cv_capture.release()
-        cv2.destroyAllWindows()
 
         end_time = time.time()
 
-        return f'Done! Analyzed {len(self.x_lst)} frames, used {round(end_time - start_time, 2)} seconds'
+        info = f'Done! Analyzed {int(self.trajectory.measured.sum())} frames, used {round(end_time - start_time, 2)} seconds'
+        if len(self.arenas) > 1:
+            info += f', {len(self.arenas)} arenas'
+        if self.tracker.search_radius:
+            info += f', {sum(each.window_hits for each in self.trackers)} frames found in the search window, ' \
+                    f'{sum(each.full_searches for each in self.trackers)} searched in the whole frame'
+        if self.reader is not None:
+            stats = self.reader.stats()
+            info += f', reader queue occupancy {stats["mean_occupancy"]}/{stats["queue_depth"]}, ' \
+                    f'{stats["consumer_stalls"]} decode stalls'
+        if self.preview is not None:
+            stats = self.preview.stats()
+            info += f', {stats["rendered"]} previews shown'
+        if self.timer.enabled:
+            info += '\n' + self.timer.summary()
+            if self.timing_path:
+                self.timer.dump(self.timing_path)
+
+        return info
@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: heatmap.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 21:10
+@Description: Occupancy grid of the positions for the heatmap, can be accumulated while detecting
+"""
+import cv2
+import numpy as np
+
+# Pixels per bin side, and the sigma of the gaussian smoothing in pixels
+DEFAULT_BIN_SIZE = 4
+DEFAULT_SIGMA = 6
+
+
+class OccupancyGrid:
+
+    def __init__(self, width, height, bin_size=DEFAULT_BIN_SIZE):
+        """
+        Number of frames in each bin of bin_size x bin_size pixels. The positions are counted by a
+        np.bincount of their linear bin index, so it can be fed by chunks of a trajectory
+
+        Parameters
+        ----------
+        width, height : int
+            Size of the frames, the positions out of it are not counted
+        bin_size : int, optional
+            Pixels per bin side. Default is DEFAULT_BIN_SIZE
+
+        """
+
+        self.width = max(1, int(width))
+        self.height = max(1, int(height))
+        self.bin_size = max(1, int(bin_size))
+        self.columns = -(-self.width // self.bin_size)
+        self.rows = -(-self.height // self.bin_size)
+        self.counts = np.zeros(self.rows * self.columns, dtype=np.int64)
+
+        # Number of positions fed, for update()
+        self.frames = 0
+
+    @classmethod
+    def from_positions(cls, x_lst, y_lst, width, height, bin_size=DEFAULT_BIN_SIZE):
+        grid = cls(width=width, height=height, bin_size=bin_size)
+        grid.add(x_lst, y_lst)
+
+        return grid
+
+    def add(self, x_lst, y_lst):
+        """
+        Count the positions
+
+        Parameters
+        ----------
+        x_lst, y_lst : List or Array
+
+        Returns
+        -------
+
+        """
+
+        x_arr = np.asarray(x_lst, dtype=np.int64)
+        y_arr = np.asarray(y_lst, dtype=np.int64)
+        self.frames += len(x_arr)
+
+        inside = (x_arr >= 0) & (x_arr < self.width) & (y_arr >= 0) & (y_arr < self.height)
+        if not inside.all():
+            x_arr = x_arr[inside]
+            y_arr = y_arr[inside]
+        self.counts += np.bincount(y_arr // self.bin_size * self.columns + x_arr // self.bin_size,
+                                   minlength=self.counts.size)
+
+    def update(self, trajectory):
+        """
+        Count the positions of the trajectory appended since the last update
+
+        Parameters
+        ----------
+        trajectory : Trajectory
+
+        Returns
+        -------
+
+        """
+
+        if len(trajectory) > self.frames:
+            self.add(trajectory.x[self.frames:], trajectory.y[self.frames:])
+
+    def reset(self):
+        self.counts[:] = 0
+        self.frames = 0
+
+    @property
+    def grid(self):
+        """
+        Counts as a [rows, columns] array, the first row is the top of the frame
+        """
+
+        return self.counts.reshape(self.rows, self.columns)
+
+    @property
+    def extent(self):
+        """
+        Extent of the grid in pixels for imshow with origin='upper', [left, right, bottom, top]
+        """
+
+        return [0, self.columns * self.bin_size, self.rows * self.bin_size, 0]
+
+    def smoothed(self, sigma=DEFAULT_SIGMA):
+        """
+        Grid smoothed by a gaussian
+
+        Parameters
+        ----------
+        sigma : float, optional
+            Sigma in pixels, converted to bins. Default is DEFAULT_SIGMA, 0 for no smoothing
+
+        Returns
+        -------
+        grid : 2-D array
+            float32
+        """
+
+        grid = self.grid.astype(np.float32)
+        if sigma > 0:
+            grid = cv2.GaussianBlur(grid, (0, 0), sigma / self.bin_size, borderType=cv2.BORDER_REFLECT)
+
+        return grid
@@ -0,0 +1,173 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: kinematics.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 22:20
+@Description: Smoothed position, speed, acceleration, heading and immobility of a trajectory, vectorized
+"""
+import numpy as np
+
+from MiTrace.utils.utils import true_runs
+
+# Width of the moving average of the positions, the speed under which the object is immobile in
+# cm/s (px/s without calibration), and the shortest immobility bout
+DEFAULT_SMOOTH_SECONDS = 0.2
+DEFAULT_IMMOBILITY_SPEED = 2.0
+DEFAULT_IMMOBILITY_SECONDS = 1.0
+
+
+def moving_average(values, window):
+    """
+    Centered moving average by a cumulative sum, the ends are padded with the first and the last
+    values
+
+    Parameters
+    ----------
+    values : Array
+        1-D array
+    window : int
+        Number of values averaged, made odd
+
+    Returns
+    -------
+    averaged : Array
+        float64, same length as values
+    """
+
+    values = np.asarray(values, dtype=np.float64)
+    half = max(0, int(window) // 2)
+    if half == 0 or len(values) == 0:
+        return values.copy()
+
+    padded = np.pad(values, half, mode='edge')
+    cumsum = np.empty(len(padded) + 1, dtype=np.float64)
+    cumsum[0] = 0
+    np.cumsum(padded, out=cumsum[1:])
+
+    return (cumsum[2 * half + 1:] - cumsum[:-2 * half - 1]) / (2 * half + 1)
+
+
+class Kinematics:
+
+    def __init__(self, x_lst, y_lst, fps, px_per_cm=None, frame=None, smooth_seconds=DEFAULT_SMOOTH_SECONDS,
+                 immobility_speed=DEFAULT_IMMOBILITY_SPEED, immobility_seconds=DEFAULT_IMMOBILITY_SECONDS):
+        """
+        Kinematics of a trajectory in seconds and centimeters, or pixels without calibration.
+        Every quantity is computed for all the frames at once with numpy
+        1. Smoothed position, moving average over smooth_seconds
+        2. Speed and heading, from the central differences of the smoothed position
+        3. Acceleration, the central differences of the speed
+        4. Immobility, speed under immobility_speed for at least immobility_seconds
+
+        Parameters
+        ----------
+        x_lst, y_lst : List or Array
+            Positions in pixels, the missed detections already filled
+        fps : float
+            Frames per second of the video, cv2.CAP_PROP_FPS
+        px_per_cm : float, optional
+            Pixels per centimeter, measured on img_for_calibration.png. Default is None, in pixels
+        frame : Array, optional
+            Frame index of each position in the video, for the time. Default is None, from 0
+        smooth_seconds : float, optional
+            Width of the moving average. Default is DEFAULT_SMOOTH_SECONDS, 0 for no smoothing
+        immobility_speed : float, optional
+            Speed under which the object is immobile, in cm/s, or px/s without calibration.
+            Default is DEFAULT_IMMOBILITY_SPEED
+        immobility_seconds : float, optional
+            Shortest immobility bout. Default is DEFAULT_IMMOBILITY_SECONDS
+
+        """
+
+        if not fps or fps <= 0:
+            raise ValueError(f'The frame rate should be positive, got {fps}')
+
+        self.fps = float(fps)
+        self.px_per_cm = px_per_cm
+        self.unit = 'cm' if px_per_cm else 'px'
+        scale = 1 / px_per_cm if px_per_cm else 1.0
+
+        n_frames = len(x_lst)
+        frame = np.arange(n_frames) if frame is None else np.asarray(frame)
+        self.frame = frame
+        self.time = frame / self.fps
+
+        window = int(round(smooth_seconds * self.fps)) | 1
+        self.x = moving_average(x_lst, window) * scale
+        self.y = moving_average(y_lst, window) * scale
+
+        # np.gradient needs two frames
+        if n_frames > 1:
+            vx = np.gradient(self.x) * self.fps
+            vy = np.gradient(self.y) * self.fps
+            self.speed = np.hypot(vx, vy)
+            self.acceleration = np.gradient(self.speed) * self.fps
+        else:
+            vx, vy, self.speed, self.acceleration = np.zeros((4, n_frames))
+
+        # Degrees counterclockwise from the right, the y axis of the image points down.
+        # NaN when the object doesn't move
+        self.heading = np.degrees(np.arctan2(-vy, vx))
+        self.heading[self.speed == 0] = np.nan
+
+        # Immobile bouts, the shorter runs under the speed are moving
+        self.immobility_speed = immobility_speed
+        self.immobility_frames = max(1, int(round(immobility_seconds * self.fps)))
+        starts, lengths = true_runs(self.speed < immobility_speed)
+        keep = lengths >= self.immobility_frames
+        self.bout_starts = starts[keep]
+        self.bout_lengths = lengths[keep]
+
+        self.immobile = np.zeros(n_frames, dtype=bool)
+        if len(self.bout_starts):
+            # +1 at the start and -1 after the end of each bout, the bouts don't touch each other
+            edges = np.zeros(n_frames + 1, dtype=np.int8)
+            edges[self.bout_starts] = 1
+            edges[self.bout_starts + self.bout_lengths] = -1
+            self.immobile = np.cumsum(edges[:-1], dtype=np.int8) > 0
+
+    def bouts(self):
+        """
+        Immobility bouts
+
+        Returns
+        -------
+        bouts : dict
+            start frame, end frame (included), start time and duration in seconds of each bout,
+            as arrays
+        """
+
+        start = self.frame[self.bout_starts]
+        end = self.frame[self.bout_starts + self.bout_lengths - 1]
+
+        return {
+            'start frame': start,
+            'end frame': end,
+            'start time': start / self.fps,
+            'duration': self.bout_lengths / self.fps,
+        }
+
+    def summary(self):
+        """
+        Summary of the whole trajectory
+
+        Returns
+        -------
+        summary : dict
+        """
+
+        distance = float(np.hypot(np.diff(self.x), np.diff(self.y)).sum()) if len(self.x) > 1 else 0.0
+        duration = len(self.x) / self.fps
+
+        return {
+            'unit': self.unit,
+            'duration': round(duration, 4),
+            'distance': round(distance, 4),
+            'mean speed': round(float(self.speed.mean()), 4) if len(self.speed) else 0.0,
+            'max speed': round(float(self.speed.max()), 4) if len(self.speed) else 0.0,
+            'immobile bouts': len(self.bout_starts),
+            'immobile time': round(float(self.bout_lengths.sum()) / self.fps, 4),
+            'immobile ratio': round(float(self.immobile.mean()), 4) if len(self.immobile) else 0.0,
+        }
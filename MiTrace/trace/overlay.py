@@ -0,0 +1,137 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: overlay.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 18:40
+@Description: Overlays of the preview, the cached roi layer and the trail of the last positions
+"""
+import cv2
+import numpy as np
+
+from MiTrace.trace.roi import draw_roi
+
+
+class RoiOverlay:
+
+    def __init__(self, roi_lst, roi_name_lst, width, height, color=(255, 255, 255)):
+        """
+        Rois and their names rendered once into a layer and a mask, composited on a frame by a
+        single cv2.copyTo, the cost doesn't depend on the number of rois
+
+        Parameters
+        ----------
+        roi_lst : List
+            Rois, see MiTrace.trace.roi
+        roi_name_lst : List
+        width, height : int
+            Size of the frames
+        color : tuple, optional
+
+        """
+
+        self.width = width
+        self.height = height
+
+        # The shapes and the names are drawn with the default LINE_8, without anti-aliasing. OpenCV 5
+        # anti-aliases putText anyway, its edges are cut at half coverage, so the overlay is always a
+        # solid color under a binary mask
+        coverage = np.zeros((height, width), dtype=np.uint8)
+        for idx, each in enumerate(roi_lst or []):
+            coverage = draw_roi(coverage, each, roi_name_lst[idx], color=(255, 255, 255))
+        self.mask = (coverage >= 128).astype(np.uint8)
+        self.layer = np.zeros((height, width, 3), dtype=np.uint8)
+        self.layer[self.mask.astype(bool)] = color
+
+    def apply(self, frame):
+        """
+        Composite the rois on the frame in place
+
+        Parameters
+        ----------
+        frame : Array
+            Frame of width x height
+
+        Returns
+        -------
+        frame : Array
+        """
+
+        return cv2.copyTo(self.layer, self.mask, frame)
+
+
+class TrailBuffer:
+
+    def __init__(self, size=80):
+        """
+        Last positions of the object in a fixed-size ring buffer, drawn by a single cv2.polylines
+
+        Parameters
+        ----------
+        size : int, optional
+            Number of positions kept. Default is 80
+
+        """
+
+        self.size = max(1, size)
+        self._points = np.zeros((self.size, 2), dtype=np.int32)
+        self._head = 0
+        self.count = 0
+
+    def push(self, x, y):
+        """
+        Add a position, the missed detections (-1) are skipped
+
+        Parameters
+        ----------
+        x, y : int
+
+        Returns
+        -------
+
+        """
+
+        if x == -1:
+            return
+        self._points[self._head] = (x, y)
+        self._head = (self._head + 1) % self.size
+        self.count = min(self.count + 1, self.size)
+
+    def points(self):
+        """
+        The positions kept, from the oldest to the newest
+
+        Returns
+        -------
+        points : Array
+            [count, 2] array of int32, a copy
+        """
+
+        if self.count < self.size:
+            return self._points[:self.count].copy()
+
+        return np.concatenate([self._points[self._head:], self._points[:self._head]])
+
+    @staticmethod
+    def draw(frame, points, color=(255, 255, 255), thickness=2):
+        """
+        Draw the trail of points on the frame
+
+        Parameters
+        ----------
+        frame : Array
+        points : Array
+            [n, 2] positions, from points()
+        color : tuple, optional
+        thickness : int, optional
+
+        Returns
+        -------
+        frame : Array
+        """
+
+        if len(points) > 1:
+            cv2.polylines(frame, [points.reshape(-1, 1, 2)], False, color, thickness)
+
+        return frame
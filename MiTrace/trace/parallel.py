@@ -0,0 +1,190 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: parallel.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 11:10
+@Description: Detect a single video with multiple processes, each process detects a segment of frames
+"""
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import cv2
+import numpy as np
+
+from MiTrace.io.frame_reader import read_frames
+from MiTrace.trace.detectors import DEFAULT_DETECTOR
+from MiTrace.trace.tracking import Tracker
+from MiTrace.trace.trajectory import Trajectory
+from MiTrace.utils.utils import forward_fill
+
+
+def split_frames(start_frame, end_frame, n_segments, stride=1):
+    """
+    Split [start_frame, end_frame) into continuous segments with nearly equal length
+
+    Parameters
+    ----------
+    start_frame : int
+    end_frame : int
+    n_segments : int
+    stride : int, optional
+        The segments start on the frames start_frame + k * stride, so detecting every
+        stride-th frame of each segment is the same with detecting the whole range. Default is 1
+
+    Returns
+    -------
+    segments : List
+        [(start, end), ...] of each segment, in order
+    """
+
+    n_steps = max(0, -(-(end_frame - start_frame) // stride))
+    n_segments = max(1, min(n_segments, n_steps))
+    bounds = start_frame + stride * np.linspace(0, n_steps, n_segments + 1).astype(int)
+    bounds[-1] = max(start_frame, end_frame)
+
+    return [(int(bounds[i]), int(bounds[i + 1])) for i in range(n_segments)]
+
+
+def detect_segment(video_path, video_adjust, threshold, start_frame, end_frame, stride=1, search_radius=None,
+                   detector=DEFAULT_DETECTOR):
+    """
+    Detect the frames in [start_frame, end_frame) of a video, run in the worker process
+
+    Parameters
+    ----------
+    video_path : str
+        Path of the video, each worker opens its own cv2.VideoCapture
+    video_adjust : List
+        [x, y, width, height] for resize the video view
+    threshold : int
+        Threshold for cv2.inRange
+    start_frame : int
+    end_frame : int
+    stride : int, optional
+        Only detect every stride-th frame. Default is 1
+    search_radius : int, optional
+        Half size of the search window of Tracker. Default is None, search the whole frame
+    detector : str, optional
+        Name of the detector in MiTrace.trace.detectors.DETECTORS. Default is 'contour'
+
+    Returns
+    -------
+    frame_lst : Array
+        Frame index of the frames detected. Shorter than the segment if the video can not be
+        read to end_frame
+    x_lst, y_lst : Array
+        Raw positions, -1 for not detected
+    area_lst : Array
+        Area of the object, 0 for not detected
+    """
+
+    # One process per core already, don't let OpenCV start more threads
+    cv2.setNumThreads(1)
+
+    cv_capture = cv2.VideoCapture(video_path)
+    cv_capture.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+
+    length = max(0, -(-(end_frame - start_frame) // stride))
+    frame_lst = np.zeros(length, dtype=np.int32)
+    x_lst = np.full(length, -1, dtype=np.int32)
+    y_lst = np.full(length, -1, dtype=np.int32)
+    area_lst = np.zeros(length, dtype=np.float32)
+
+    tracker = Tracker(video_adjust=video_adjust, threshold=threshold, search_radius=search_radius,
+                      detector=detector)
+    n_frames = 0
+    for idx, frame in read_frames(cv_capture=cv_capture, n_frames=end_frame - start_frame, stride=stride):
+        frame_lst[n_frames] = start_frame + idx
+        _, _, detected = tracker.locate(original_frame=frame)
+        x_lst[n_frames], y_lst[n_frames], area_lst[n_frames] = detected.x, detected.y, detected.area
+        n_frames += 1
+
+    cv_capture.release()
+
+    return frame_lst[:n_frames], x_lst[:n_frames], y_lst[:n_frames], area_lst[:n_frames]
+
+
+def detect_video_parallel(video_path, video_adjust=None, start_frame=0, end_frame=-1, threshold=30,
+                          n_workers=None, frame_stride=1, search_radius=None, detector=DEFAULT_DETECTOR):
+    """
+    Split [start_frame, end_frame) into n_workers segments and detect them in parallel,
+    the results are stitched back in order, the missed detections are filled with the most
+    previous position, across the segment boundaries too
+
+    The seek to a segment is done by cv2.CAP_PROP_POS_FRAMES, which is frame accurate for the
+    common containers with the FFmpeg backend
+
+    Parameters
+    ----------
+    video_path : str
+        Path of the video
+    video_adjust : List
+        [x, y, width, height] for resize the video view
+    start_frame : int, optional
+        Detect video from which frame. Default is 0
+    end_frame : int, optional
+        End frame of frame detection. Default is -1, for the end of video
+    threshold : int
+        Threshold for cv2.inRange
+    n_workers : int, optional
+        Number of processes. Default is None, for the number of cores
+    frame_stride : int, optional
+        Only detect every frame_stride-th frame, interpolate the others. Default is 1
+    search_radius : int, optional
+        Half size of the search window of Tracker. Default is None, search the whole frame
+    detector : str, optional
+        Name of the detector in MiTrace.trace.detectors.DETECTORS. Default is 'contour'
+
+    Returns
+    -------
+    trajectory : Trajectory
+        Trajectory of object, same with Detection.trajectory
+    info : str
+        Information of the detection
+    """
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    frame_stride = max(1, frame_stride)
+
+    # An end_frame after the end of the video is cut to it
+    cv_capture = cv2.VideoCapture(video_path)
+    frame_count = int(cv_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    cv_capture.release()
+    if end_frame == -1 or 0 < frame_count < end_frame:
+        end_frame = frame_count
+
+    start_time = time.time()
+
+    segments = split_frames(start_frame, end_frame, n_workers, stride=frame_stride)
+    with ProcessPoolExecutor(max_workers=len(segments)) as pool:
+        futures = [pool.submit(detect_segment, video_path, video_adjust, threshold, start, end, frame_stride,
+                               search_radius, detector) for start, end in segments]
+        results = [each.result() for each in futures]
+
+    # Same as reading frame by frame, stop at the first segment which can not be read to its end.
+    # That is the end of the video in the last segment, the video is read to its end then
+    n_frames = 0
+    finished = True
+    for idx, ((start, end), (frame_segment, _, _, _)) in enumerate(zip(segments, results)):
+        n_frames += len(frame_segment)
+        if len(frame_segment) < -(-(end - start) // frame_stride):
+            finished = idx == len(segments) - 1
+            break
+
+    frame_lst, x_raw, y_raw, area = [np.concatenate([each[i] for each in results])[:n_frames] for i in range(4)]
+    x_lst, y_lst = forward_fill(x_raw, y_raw)
+    trajectory = Trajectory.from_arrays(x=x_lst, y=y_lst, frame=frame_lst, valid=x_raw != -1, area=area)
+    if frame_stride > 1:
+        # The frames after the last detected one hold its position, same with Detection
+        last_frame = min(end_frame - 1, frame_lst[-1] + frame_stride - 1) if finished and n_frames else None
+        trajectory = trajectory.interpolated(last_frame=last_frame)
+
+    end_time = time.time()
+    info = f'Done! Analyzed {n_frames} frames with {len(segments)} processes, ' \
+           f'used {round(end_time - start_time, 2)} seconds'
+
+    return trajectory, info
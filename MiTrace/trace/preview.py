@@ -0,0 +1,235 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: preview.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 18:10
+@Description: Live preview of the detection, rendered at a fixed rate in its own thread
+"""
+import threading
+import time
+
+import cv2
+
+from MiTrace.trace.overlay import RoiOverlay, TrailBuffer
+
+
+class HighGuiSink:
+    """
+    Show the preview in two cv2.imshow windows, ESC requests to stop the detection.
+    HighGUI is not thread-safe, so it is shown from the detection loop by Preview.poll, only the
+    drawing is done in the render thread
+    """
+
+    thread_safe = False
+
+    def show(self, frame, frame_thresh):
+        """
+        Returns
+        -------
+        keep : bool
+            False if stop is requested
+        """
+
+        cv2.imshow('Threshold', frame_thresh)
+        cv2.imshow('Original video roi', frame)
+
+        return cv2.waitKey(1) & 0xFF != 27
+
+    def close(self):
+        cv2.destroyAllWindows()
+
+
+class Preview:
+
+    def __init__(self, roi_lst=None, roi_name_lst=None, rate=10, history=80, sink=None):
+        """
+        Preview of the detection as a separate consumer. The detection loop only hands over the
+        latest state when a preview is due, at most rate times per second; a render thread draws
+        and shows it. A state not rendered yet is replaced by the newer one, so the detection
+        never waits for the drawing or the display
+
+        Parameters
+        ----------
+        roi_lst : List, optional
+            Rois drawn on the preview
+        roi_name_lst : List, optional
+        rate : float, optional
+            Preview per second. Default is 10, 0 for every frame
+        history : int, optional
+            Number of positions of the trail. Default is 80
+        sink : object, optional
+            Object with show(frame, frame_thresh) returning False to stop the detection, and
+            close(). show is called in the render thread if sink.thread_safe is True, otherwise
+            from poll() in the detection loop, and close() from stop(). Default is HighGuiSink
+
+        """
+
+        self.roi_lst = roi_lst
+        self.roi_name_lst = roi_name_lst
+        self.interval = 1 / rate if rate else 0
+        self.sink = sink if sink is not None else HighGuiSink()
+
+        # Trail fed by the detection loop every frame, the roi layer is rendered on the first preview
+        self.trail = TrailBuffer(size=history)
+        self._overlay = None
+
+        # Set by the sink, checked by the detection loop
+        self.stop_requested = False
+
+        self._state = None
+        # Rendered images waiting for poll(), for a sink which is not thread-safe
+        self._ready = None
+        self._running = False
+        self._condition = threading.Condition()
+        self._thread = None
+        self._next_time = 0
+
+        # Counters
+        self.submitted = 0
+        self.rendered = 0
+        self.dropped = 0
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name='MiTracePreview', daemon=True)
+        self._thread.start()
+
+        return self
+
+    def record(self, x, y):
+        """
+        Add the position of every frame to the trail, cheap enough to call every frame
+
+        Parameters
+        ----------
+        x, y : int
+
+        Returns
+        -------
+
+        """
+
+        self.trail.push(x, y)
+
+    def due(self):
+        """
+        A preview should be submitted for this frame, cheap enough to call every frame
+
+        Returns
+        -------
+        due : bool
+        """
+
+        now = time.perf_counter()
+        if now < self._next_time:
+            return False
+        self._next_time = now + self.interval
+
+        return True
+
+    def submit(self, frame, frame_thresh, x, y, contour):
+        """
+        Hand over the state of a frame with the trail, the images are copied since the buffers
+        are reused
+
+        Parameters
+        ----------
+        frame : Array
+            Frame resized by video_adjust
+        frame_thresh : 2-D array
+        x, y : int
+            Position of the object
+        contour : Array
+            Contour of the object, None if not available
+
+        Returns
+        -------
+
+        """
+
+        state = (frame.copy(), frame_thresh.copy(), int(x), int(y), None if contour is None else contour.copy(),
+                 self.trail.points())
+        with self._condition:
+            if self._state is not None:
+                self.dropped += 1
+            self._state = state
+            self.submitted += 1
+            self._condition.notify()
+
+    def stop(self):
+        """
+        Render the last state submitted, then stop the render thread and close the sink
+
+        Returns
+        -------
+
+        """
+
+        with self._condition:
+            self._running = False
+            self._condition.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.poll()
+        self.sink.close()
+
+    def poll(self):
+        """
+        Show the image rendered last if the sink is not thread-safe, in the calling thread, which
+        should be the one owning the windows. Cheap enough to call every frame
+
+        Returns
+        -------
+
+        """
+
+        if self._ready is None:
+            return
+        with self._condition:
+            images, self._ready = self._ready, None
+        if images is not None and not self.sink.show(*images):
+            self.stop_requested = True
+
+    def _run(self):
+        thread_safe = getattr(self.sink, 'thread_safe', False)
+        while True:
+            with self._condition:
+                while self._state is None and self._running:
+                    self._condition.wait()
+                state, self._state = self._state, None
+                if state is None:
+                    break
+            images = self._render(*state)
+            if thread_safe:
+                if not self.sink.show(*images):
+                    self.stop_requested = True
+            else:
+                with self._condition:
+                    self._ready = images
+            self.rendered += 1
+
+    def _render(self, frame, frame_thresh, x, y, contour, trail):
+        if self._overlay is None or (self._overlay.height, self._overlay.width) != frame.shape[:2]:
+            self._overlay = RoiOverlay(self.roi_lst, self.roi_name_lst, frame.shape[1], frame.shape[0])
+
+        cv2.circle(frame, (x, y), 3, (255, 255, 255), -1)
+        if contour is not None:
+            cv2.drawContours(frame, contour, -1, (255, 255, 255), 2)
+        TrailBuffer.draw(frame, trail)
+        frame = self._overlay.apply(frame)
+
+        return frame, frame_thresh
+
+    def stats(self):
+        """
+        Counters of the preview
+
+        Returns
+        -------
+        stats : dict
+        """
+
+        return {'submitted': self.submitted, 'rendered': self.rendered, 'dropped': self.dropped}
@@ -0,0 +1,256 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: roi.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 12:40
+@Description: Shapes of roi, and the rasterized roi index for locating positions in rois
+"""
+import cv2
+import numpy as np
+
+# A roi can be
+#     [x, y, width, height]                                       rectangle, as selected in the GUI
+#     {'type': 'polygon', 'points': [[x0, y0], [x1, y1], ...]}    polygon
+#     {'type': 'circle', 'center': [x, y], 'radius': r}           circle
+ROI_TYPES = ('rectangle', 'polygon', 'circle')
+
+
+def roi_type(roi):
+    """
+    Type of a roi, one of ROI_TYPES
+
+    Parameters
+    ----------
+    roi : List or dict
+
+    Returns
+    -------
+    roi_type : str
+    """
+
+    if isinstance(roi, dict):
+        if roi.get('type') not in ROI_TYPES:
+            raise ValueError(f'Unknown roi type {roi.get("type")}, should be one of {ROI_TYPES}')
+        return roi['type']
+
+    if len(roi) != 4:
+        raise ValueError(f'A rectangle roi should be [x, y, width, height], got {roi}')
+    return 'rectangle'
+
+
+def roi_name(roi):
+    """
+    Default name of a roi, the GUI names a rectangle roi by its (x, y, width, height)
+
+    Parameters
+    ----------
+    roi : List or dict
+
+    Returns
+    -------
+    name : str
+    """
+
+    shape = roi_type(roi)
+    if shape == 'rectangle':
+        return str(tuple(roi))
+    if shape == 'polygon':
+        return f'polygon{tuple(tuple(each) for each in roi["points"])}'
+    return f'circle{tuple(roi["center"]) + (roi["radius"],)}'
+
+
+def roi_extent(roi):
+    """
+    Right-bottom extent of a roi, the pixels of the roi are all in [0, width) x [0, height)
+
+    Parameters
+    ----------
+    roi : List or dict
+
+    Returns
+    -------
+    width, height : int
+    """
+
+    shape = roi_type(roi)
+    if shape == 'rectangle':
+        return max(0, roi[0] + roi[2]), max(0, roi[1] + roi[3])
+    if shape == 'polygon':
+        points = np.asarray(roi['points'])
+        return max(0, int(points[:, 0].max()) + 1), max(0, int(points[:, 1].max()) + 1)
+    return max(0, int(np.ceil(roi['center'][0] + roi['radius']))), \
+        max(0, int(np.ceil(roi['center'][1] + roi['radius'])))
+
+
+def roi_mask(roi, width, height):
+    """
+    Rasterize a roi into a boolean mask
+
+    Parameters
+    ----------
+    roi : List or dict
+    width, height : int
+        Size of the mask
+
+    Returns
+    -------
+    mask : 2-D array
+        True for the pixels in the roi
+    """
+
+    mask = np.zeros((height, width), dtype=bool)
+    shape = roi_type(roi)
+
+    if shape == 'rectangle':
+        # Same with the old per row check roi[0] < x < roi[0] + roi[2], the border is not in the roi
+        mask[max(0, roi[1] + 1): max(0, roi[1] + roi[3]), max(0, roi[0] + 1): max(0, roi[0] + roi[2])] = True
+    elif shape == 'polygon':
+        canvas = np.zeros((height, width), dtype=np.uint8)
+        cv2.fillPoly(canvas, [np.asarray(roi['points'], dtype=np.int32)], 1)
+        mask = canvas.astype(bool)
+    else:
+        yy, xx = np.ogrid[:height, :width]
+        mask = (xx - roi['center'][0]) ** 2 + (yy - roi['center'][1]) ** 2 < roi['radius'] ** 2
+
+    return mask
+
+
+def draw_roi(image, roi, name, color=(255, 255, 255)):
+    """
+    Draw a roi and its name on the image
+
+    Parameters
+    ----------
+    image : Array
+    roi : List or dict
+    name : str
+    color : tuple, optional
+
+    Returns
+    -------
+    image : Array
+    """
+
+    shape = roi_type(roi)
+    if shape == 'rectangle':
+        image = cv2.rectangle(image, (roi[0], roi[1]), (roi[0] + roi[2], roi[1] + roi[3]), color=color)
+        origin = (roi[0], roi[1])
+    elif shape == 'polygon':
+        points = np.asarray(roi['points'], dtype=np.int32)
+        image = cv2.polylines(image, [points], True, color)
+        origin = (int(points[:, 0].min()), int(points[:, 1].min()))
+    else:
+        center = (int(roi['center'][0]), int(roi['center'][1]))
+        image = cv2.circle(image, center, int(roi['radius']), color)
+        origin = (center[0] - int(roi['radius']), center[1] - int(roi['radius']))
+
+    return cv2.putText(image, name, origin, cv2.FONT_HERSHEY_SIMPLEX, 0.5, color, 1)
+
+
+class RoiIndex:
+
+    def __init__(self, roi_lst, width=0, height=0):
+        """
+        Rasterize the rois once, then locate all the positions by array indexing
+        1. Label mask, value of a pixel is the index + 1 of the first roi it is in, 0 for no roi
+        2. Bit mask, bit i of a pixel is set if it is in roi i, for the overlapping rois
+
+        Parameters
+        ----------
+        roi_lst : List
+            A list of rois, see ROI_TYPES
+        width, height : int, optional
+            Size of the masks, usually the width and height of video_adjust. It is extended to
+            cover all the rois, the positions out of the masks are in no roi
+
+        """
+
+        if len(roi_lst) > 64:
+            raise ValueError(f'At most 64 rois are supported, got {len(roi_lst)}')
+
+        self.roi_lst = roi_lst
+        for roi in roi_lst:
+            width = max(width, roi_extent(roi)[0])
+            height = max(height, roi_extent(roi)[1])
+        self.width = width
+        self.height = height
+
+        self.label_mask = np.zeros((height, width), dtype=np.uint8)
+        bit_dtype = np.uint8
+        for dtype in (np.uint8, np.uint16, np.uint32, np.uint64):
+            bit_dtype = dtype
+            if len(roi_lst) <= np.dtype(dtype).itemsize * 8:
+                break
+        self.bit_mask = np.zeros((height, width), dtype=bit_dtype)
+
+        # Draw from the last one, the first roi wins on the overlapping area
+        for idx in range(len(roi_lst) - 1, -1, -1):
+            mask = roi_mask(roi_lst[idx], width, height)
+            self.label_mask[mask] = idx + 1
+            self.bit_mask[mask] |= bit_dtype(1) << bit_dtype(idx)
+
+    def _pixels(self, x_lst, y_lst):
+        """
+        Pixel index of the positions, and which ones are inside the masks
+
+        Returns
+        -------
+        x_arr, y_arr : Array
+        inside : Array
+        """
+
+        x_arr = np.asarray(x_lst)
+        y_arr = np.asarray(y_lst)
+        if x_arr.dtype.kind == 'f':
+            x_arr = np.floor(x_arr)
+            y_arr = np.floor(y_arr)
+        x_arr = x_arr.astype(np.intp)
+        y_arr = y_arr.astype(np.intp)
+        inside = (x_arr >= 0) & (x_arr < self.width) & (y_arr >= 0) & (y_arr < self.height)
+
+        return x_arr, y_arr, inside
+
+    def locate(self, x_lst, y_lst):
+        """
+        The first roi each position is in
+
+        Parameters
+        ----------
+        x_lst, y_lst : List or Array
+            Positions
+
+        Returns
+        -------
+        labels : Array
+            index + 1 of the roi, 0 for no roi
+        """
+
+        x_arr, y_arr, inside = self._pixels(x_lst, y_lst)
+        labels = np.zeros(len(x_arr), dtype=self.label_mask.dtype)
+        labels[inside] = self.label_mask[y_arr[inside], x_arr[inside]]
+
+        return labels
+
+    def membership(self, x_lst, y_lst):
+        """
+        All the rois each position is in, the overlapping rois are considered
+
+        Parameters
+        ----------
+        x_lst, y_lst : List or Array
+            Positions
+
+        Returns
+        -------
+        member : 2-D array
+            [frames, rois] boolean array, True if the position is in the roi
+        """
+
+        x_arr, y_arr, inside = self._pixels(x_lst, y_lst)
+        bits = np.zeros(len(x_arr), dtype=self.bit_mask.dtype)
+        bits[inside] = self.bit_mask[y_arr[inside], x_arr[inside]]
+
+        shifts = np.arange(len(self.roi_lst), dtype=self.bit_mask.dtype)
+        return ((bits[:, None] >> shifts) & self.bit_mask.dtype.type(1)).astype(bool)
@@ -0,0 +1,186 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: threshold.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 20:40
+@Description: Frames sampled across a video for tuning the threshold, blurred once and previewed by a lookup table
+"""
+import math
+
+import cv2
+import numpy as np
+
+from MiTrace.utils.utils import crop_frame
+
+# Gap between the tiles of the preview, and its gray level
+TILE_GAP = 4
+GAP_VALUE = 96
+
+
+def sample_frames(video_path, count=9, video_adjust=None, start_frame=0, end_frame=-1):
+    """
+    Frames spread evenly between start_frame and end_frame
+
+    Parameters
+    ----------
+    video_path : str
+    count : int, optional
+        Number of frames. Default is 9
+    video_adjust : List, optional
+        [x, y, width, height] crop of the frames, same with Detection
+    start_frame : int, optional
+    end_frame : int, optional
+        -1 for the end of the video
+
+    Returns
+    -------
+    frame_indexes : List
+        Index of the frames read successfully
+    frames : List
+        Cropped frames
+    """
+
+    cv_capture = cv2.VideoCapture(video_path)
+    frame_count = int(cv_capture.get(cv2.CAP_PROP_FRAME_COUNT))
+    if end_frame == -1 or end_frame > frame_count:
+        end_frame = frame_count
+    end_frame = max(end_frame, start_frame + 1)
+
+    frame_indexes, frames = [], []
+    for frame_index in np.unique(np.linspace(start_frame, end_frame - 1, count).astype(int)):
+        cv_capture.set(cv2.CAP_PROP_POS_FRAMES, int(frame_index))
+        success, frame = cv_capture.read()
+        if success:
+            frame_indexes.append(int(frame_index))
+            frames.append(crop_frame(frame, video_adjust).copy())
+    cv_capture.release()
+
+    return frame_indexes, frames
+
+
+class ThresholdSamples:
+
+    def __init__(self, frames, width=791, height=501, frame_indexes=None):
+        """
+        Sampled frames for tuning the threshold. The blur and the downscaling are done once,
+        after that a threshold is previewed by a single cv2.LUT on the tiled samples, and the
+        detected area of every sample is read from its cumulative gray histogram, so the cost
+        of a new threshold doesn't depend on the size of the video
+
+        Parameters
+        ----------
+        frames : List
+            BGR frames, already cropped
+        width, height : int, optional
+            Size of the preview, the samples are tiled and downscaled into it
+        frame_indexes : List, optional
+            Index of the frames in the video, for the labels of the histogram
+
+        """
+
+        if not frames:
+            raise ValueError('No frame to sample')
+
+        self.frame_indexes = list(frame_indexes) if frame_indexes is not None else list(range(len(frames)))
+        self.pixels = np.array([frame.shape[0] * frame.shape[1] for frame in frames])
+
+        # Same blur as MiTrace.utils.utils.frame_producer, so the areas are the detected ones
+        blurs = [cv2.GaussianBlur(cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY), (7, 7), 5, 5) for frame in frames]
+
+        # cumulative[i, t] is the number of pixels of sample i in cv2.inRange(blur, 0, t)
+        self.cumulative = np.cumsum([cv2.calcHist([blur], [0], None, [256], [0, 256]).ravel() for blur in blurs],
+                                    axis=1).astype(np.int64)
+
+        self.mosaic, self.gaps = self._tile(blurs, width, height)
+        self._lut = np.zeros(256, dtype=np.uint8)
+
+    @staticmethod
+    def _tile(blurs, width, height):
+        columns = math.ceil(math.sqrt(len(blurs)))
+        rows = math.ceil(len(blurs) / columns)
+        frame_height, frame_width = blurs[0].shape
+        tile_width = (width - TILE_GAP * (columns - 1)) // columns
+        tile_height = (height - TILE_GAP * (rows - 1)) // rows
+        scale = min(tile_width / frame_width, tile_height / frame_height, 1)
+        tile_width = max(1, int(frame_width * scale))
+        tile_height = max(1, int(frame_height * scale))
+
+        mosaic = np.zeros((rows * tile_height + (rows - 1) * TILE_GAP,
+                           columns * tile_width + (columns - 1) * TILE_GAP), dtype=np.uint8)
+        gaps = np.ones(mosaic.shape, dtype=bool)
+        for idx, blur in enumerate(blurs):
+            top = idx // columns * (tile_height + TILE_GAP)
+            left = idx % columns * (tile_width + TILE_GAP)
+            mosaic[top: top + tile_height, left: left + tile_width] = cv2.resize(
+                blur, (tile_width, tile_height), interpolation=cv2.INTER_AREA)
+            gaps[top: top + tile_height, left: left + tile_width] = False
+
+        return mosaic, gaps
+
+    def preview(self, threshold):
+        """
+        Threshold of the tiled samples, same as cv2.inRange(blur, 0, threshold)
+
+        Parameters
+        ----------
+        threshold : int
+
+        Returns
+        -------
+        image : 2-D array
+            uint8, 255 in the range, the gaps between the samples are gray
+        """
+
+        self._lut[:] = 0
+        self._lut[:threshold + 1] = 255
+        image = cv2.LUT(self.mosaic, self._lut)
+        image[self.gaps] = GAP_VALUE
+
+        return image
+
+    def areas(self, threshold):
+        """
+        Fraction of the pixels of each sample in the range
+
+        Parameters
+        ----------
+        threshold : int
+
+        Returns
+        -------
+        areas : Array
+        """
+
+        return self.cumulative[:, threshold] / self.pixels
+
+    def histogram(self, threshold, width=791, height=121):
+        """
+        Bar chart of the areas of the samples
+
+        Parameters
+        ----------
+        threshold : int
+        width, height : int, optional
+
+        Returns
+        -------
+        image : 2-D array
+            uint8
+        """
+
+        areas = self.areas(threshold)
+        image = np.full((height, width), 255, dtype=np.uint8)
+        bar_width = width // len(areas)
+        # Labels take 14 pixels at the top and the bottom, the bars are scaled to the largest one
+        scale = (height - 28) / max(areas.max(), 1e-6)
+        for idx, (frame_index, area) in enumerate(zip(self.frame_indexes, areas)):
+            left = idx * bar_width
+            cv2.rectangle(image, (left + 4, height - 14 - int(area * scale)), (left + bar_width - 4, height - 15),
+                          64, -1)
+            cv2.putText(image, f'{area:.2%}', (left + 4, height - 16 - int(area * scale)),
+                        cv2.FONT_HERSHEY_SIMPLEX, 0.35, 0, 1)
+            cv2.putText(image, f'#{frame_index}', (left + 4, height - 3), cv2.FONT_HERSHEY_SIMPLEX, 0.35, 0, 1)
+
+        return image
@@ -0,0 +1,172 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: timing.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 17:30
+@Description: Per-frame timing of the stages of the detection loop
+"""
+import time
+
+import numpy as np
+
+# Stages of the detection loop
+#     decode : waiting for the next frame, reading and decoding it, or taking it from the reader thread
+#     threshold : crop, gray, blur and threshold by frame_producer
+#     detect : locating the object in the thresholded frame
+#     record : appending to the trajectory and checkpointing
+#     preview : handing the latest state to the preview, drawn and shown in the preview thread
+STAGES = ('decode', 'threshold', 'detect', 'record', 'preview')
+PERCENTILES = (50, 95, 99)
+
+
+class StageTimer:
+
+    def __init__(self, enabled=True, chunk_size=65536):
+        """
+        Time of each stage for every frame, in nanoseconds. A stage is timed from the last lap,
+        the time of a stage entered several times in a frame is summed. A disabled timer does
+        nothing, so it can always be called in the loop
+
+        Parameters
+        ----------
+        enabled : bool, optional
+            Default is True
+        chunk_size : int, optional
+            Number of frames allocated at first. Default is 65536
+
+        """
+
+        self.enabled = enabled
+        self.length = 0
+        self._index = {stage: idx for idx, stage in enumerate(STAGES)}
+        self._times = np.zeros((chunk_size if enabled else 0, len(STAGES)), dtype=np.int64)
+        self._frames = np.zeros(len(self._times), dtype=np.int64)
+        self._mark = time.perf_counter_ns()
+
+    def mark(self):
+        """
+        Start timing from now, the time before is not counted
+
+        Returns
+        -------
+
+        """
+
+        self._mark = time.perf_counter_ns()
+
+    def lap(self, stage):
+        """
+        Add the time since the last lap to a stage of the current frame
+
+        Parameters
+        ----------
+        stage : str
+            One of STAGES
+
+        Returns
+        -------
+
+        """
+
+        if not self.enabled:
+            return
+        now = time.perf_counter_ns()
+        self._times[self.length, self._index[stage]] += now - self._mark
+        self._mark = now
+
+    def next_frame(self, frame):
+        """
+        Finish the current frame
+
+        Parameters
+        ----------
+        frame : int
+            Frame index of the current frame in the video
+
+        Returns
+        -------
+
+        """
+
+        if not self.enabled:
+            return
+        self._frames[self.length] = frame
+        self.length += 1
+        if self.length == len(self._times):
+            times = np.zeros((2 * len(self._times), len(STAGES)), dtype=np.int64)
+            times[:self.length] = self._times
+            frames = np.zeros(len(times), dtype=np.int64)
+            frames[:self.length] = self._frames
+            self._times, self._frames = times, frames
+
+    @property
+    def times(self):
+        """
+        Time of each stage in seconds, [frames, stages]
+        """
+
+        return self._times[:self.length] / 1e9
+
+    def report(self):
+        """
+        Breakdown of the time by stage
+
+        Returns
+        -------
+        report : dict
+            For each stage, total seconds, share of the total time, mean and percentiles in ms
+        """
+
+        times = self.times
+        total = times.sum()
+        report = {}
+        for idx, stage in enumerate(STAGES):
+            each = times[:, idx]
+            report[stage] = {
+                'seconds': float(each.sum()),
+                'share': float(each.sum() / total) if total else 0.0,
+                'mean_ms': float(each.mean() * 1e3) if len(each) else 0.0,
+                **{f'p{q}_ms': float(np.percentile(each, q) * 1e3) if len(each) else 0.0 for q in PERCENTILES},
+            }
+
+        return report
+
+    def summary(self):
+        """
+        Breakdown of the time as text, the stages not used are skipped
+
+        Returns
+        -------
+        summary : str
+        """
+
+        report = self.report()
+        lines = [f'Stage timing of {self.length} frames, ms per frame:']
+        for stage, each in report.items():
+            if each['seconds'] == 0:
+                continue
+            lines.append(f'    {stage:<10}{each["share"]:>7.1%}  mean {each["mean_ms"]:.3f}  ' +
+                         '  '.join(f'p{q} {each[f"p{q}_ms"]:.3f}' for q in PERCENTILES))
+        if self.length:
+            lines.append(f'    limited by {max(report, key=lambda stage: report[stage]["seconds"])}')
+
+        return '\n'.join(lines)
+
+    def dump(self, path):
+        """
+        Save the time of each stage of every frame into a csv file, in ms
+
+        Parameters
+        ----------
+        path : str
+
+        Returns
+        -------
+
+        """
+
+        table = np.column_stack([self._frames[:self.length], self.times * 1e3])
+        np.savetxt(path, table, delimiter=',', header=','.join(['frame'] + [f'{stage}_ms' for stage in STAGES]),
+                   comments='', fmt=['%d'] + ['%.4f'] * len(STAGES))
@@ -0,0 +1,181 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: tracking.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 16:20
+@Description: Locate the object frame by frame, in a search window around the predicted position
+"""
+import numpy as np
+
+from MiTrace.trace.detectors import DEFAULT_DETECTOR, Detected, get_detector
+from MiTrace.trace.timing import StageTimer
+from MiTrace.utils.utils import crop_frame, frame_producer
+
+
+class Tracker:
+
+    def __init__(self, video_adjust, threshold, search_radius=None, detector=DEFAULT_DETECTOR, timer=None):
+        """
+        Locate the object in the frames of a video one by one. With a search_radius, only a
+        window around the position predicted from the last two detections is thresholded and
+        searched, the whole frame is searched if the object is not found in the window, or it
+        touches the border of the window.
+
+        Parameters
+        ----------
+        video_adjust : List
+            [x, y, width, height] for resize the video view
+        threshold : int
+            Threshold for cv2.inRange
+        search_radius : int, optional
+            Half size of the search window in pixels. Default is None, search the whole frame
+        detector : str or callable, optional
+            Name of the detector in MiTrace.trace.detectors.DETECTORS. Default is 'contour'
+        timer : StageTimer, optional
+            Add the time of thresholding and detecting to this timer. Default is None, not timed
+
+        """
+
+        self.video_adjust = video_adjust
+        self.threshold = threshold
+        self.search_radius = search_radius
+        self.detect = get_detector(detector)
+        self.timer = timer if timer is not None else StageTimer(enabled=False)
+
+        # Last detected position and the velocity for the prediction, None for lost
+        self.last_position = None
+        self.velocity = (0, 0)
+
+        # Counters of the search, reported in the information of Detection. A full search is
+        # made without a prediction, or when the object is not found in the window
+        self.window_hits = 0
+        self.full_searches = 0
+
+    def predict(self):
+        """
+        Predicted position of the object in this frame
+
+        Returns
+        -------
+        x, y : int
+        """
+
+        return self.last_position[0] + self.velocity[0], self.last_position[1] + self.velocity[1]
+
+    def search_window(self, width, height):
+        """
+        Search window around the predicted position, clipped by the frame
+
+        Parameters
+        ----------
+        width, height : int
+            Size of the frame
+
+        Returns
+        -------
+        window : List
+            [x, y, width, height] of the window, None if no window should be used
+        """
+
+        if not self.search_radius or self.last_position is None:
+            return None
+
+        x, y = self.predict()
+        x0 = min(max(x - self.search_radius, 0), width)
+        y0 = min(max(y - self.search_radius, 0), height)
+        x1 = min(max(x + self.search_radius + 1, 0), width)
+        y1 = min(max(y + self.search_radius + 1, 0), height)
+        if x1 <= x0 or y1 <= y0:
+            return None
+
+        return [x0, y0, x1 - x0, y1 - y0]
+
+    def locate(self, original_frame):
+        """
+        Locate the object in a frame
+
+        Parameters
+        ----------
+        original_frame : 3-D array
+            Frame from video
+
+        Returns
+        -------
+        frame : Array
+            Frame resized by video_adjust
+        frame_thresh : 2-D array
+            Frame in threshold range, of the search window if the object was found in it
+        detected : Detected
+            Object in the frame resized, x and y are -1 for not detected
+        """
+
+        # Crop without copying, threshold the window only
+        frame = crop_frame(original_frame=original_frame, resize=self.video_adjust)
+
+        window = self.search_window(frame.shape[1], frame.shape[0])
+        if window is not None:
+            _, frame_thresh = frame_producer(original_frame=frame, resize=window, threshold=self.threshold)
+            self.timer.lap('threshold')
+            detected = self.detect(frame_thresh)
+            self.timer.lap('detect')
+            if detected.x != -1 and not self._touch_border(detected.bbox, window, frame.shape):
+                self.window_hits += 1
+                return frame, frame_thresh, self._update(self._offset(detected, window[0], window[1]))
+
+        self.full_searches += 1
+        _, frame_thresh = frame_producer(original_frame=frame, resize=None, threshold=self.threshold)
+        self.timer.lap('threshold')
+        detected = self.detect(frame_thresh)
+        self.timer.lap('detect')
+        if detected.x == -1:
+            # Lost, search the whole frame until found again
+            self.last_position = None
+            self.velocity = (0, 0)
+            return frame, frame_thresh, detected
+
+        return frame, frame_thresh, self._update(detected)
+
+    def _update(self, detected):
+        if self.last_position is not None:
+            self.velocity = (detected.x - self.last_position[0], detected.y - self.last_position[1])
+        self.last_position = (detected.x, detected.y)
+
+        return detected
+
+    @staticmethod
+    def _offset(detected, dx, dy):
+        """
+        Move a detection in the search window to the coordinates of the frame
+
+        Returns
+        -------
+        detected : Detected
+        """
+
+        contour = None
+        if detected.contour is not None:
+            contour = detected.contour + np.array([dx, dy], dtype=detected.contour.dtype)
+        bbox = (detected.bbox[0] + dx, detected.bbox[1] + dy, detected.bbox[2], detected.bbox[3])
+
+        return Detected(detected.x + dx, detected.y + dy, detected.area, bbox, contour)
+
+    @staticmethod
+    def _touch_border(bbox, window, shape):
+        """
+        The bounding box touches a border of the window which is not a border of the frame, the
+        object may be cut by the window
+
+        Returns
+        -------
+        touch : bool
+        """
+
+        x_min, y_min, width, height = bbox
+        x_max = x_min + width - 1
+        y_max = y_min + height - 1
+
+        return (x_min == 0 and window[0] > 0) or (y_min == 0 and window[1] > 0) or \
+            (x_max == window[2] - 1 and window[0] + window[2] < shape[1]) or \
+            (y_max == window[3] - 1 and window[1] + window[3] < shape[0])
@@ -0,0 +1,274 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: trajectory.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 14:50
+@Description: Array-backed trajectory of the detected object, can be memory-mapped to files
+"""
+import os
+
+import numpy as np
+
+# Fields of a trajectory
+#     frame : frame index in the video
+#     x, y : position, the missed detections are filled with the previous position
+#     valid : the object was detected in this frame
+#     area : area of the detected object, 0 if not detected
+#     measured : the frame was processed, False for the frames interpolated
+TRAJECTORY_FIELDS = {
+    'frame': np.int32,
+    'x': np.int32,
+    'y': np.int32,
+    'valid': np.bool_,
+    'area': np.float32,
+    'measured': np.bool_,
+}
+
+
+class Trajectory:
+
+    def __init__(self, chunk_size=65536, memmap_dir=None):
+        """
+        Trajectory stored in preallocated numpy arrays, 18 bytes per frame. The arrays grow by
+        chunks, the fields are views of the filled part, so keep no reference to them across
+        appends.
+
+        Parameters
+        ----------
+        chunk_size : int, optional
+            Number of frames allocated at least for each growth. Default is 65536
+        memmap_dir : str, optional
+            Store the arrays in {memmap_dir}/{field}.dat by np.memmap instead of the memory, for
+            very long recordings. Default is None, in the memory
+
+        """
+
+        self.chunk_size = max(1, chunk_size)
+        self.memmap_dir = memmap_dir
+        self.length = 0
+        self.capacity = 0
+        self._arrays = {name: np.empty(0, dtype=dtype) for name, dtype in TRAJECTORY_FIELDS.items()}
+
+        if memmap_dir is not None:
+            os.makedirs(memmap_dir, exist_ok=True)
+
+    @classmethod
+    def from_arrays(cls, x, y, frame=None, valid=None, area=None, measured=None, **kwargs):
+        """
+        Build a trajectory from arrays
+
+        Parameters
+        ----------
+        x, y : List or Array
+            Positions
+        frame : Array, optional
+            Default is 0, 1, 2 ...
+        valid : Array, optional
+            Default is all detected
+        area : Array, optional
+            Default is 0
+        measured : Array, optional
+            Default is all measured
+
+        Returns
+        -------
+        trajectory : Trajectory
+        """
+
+        trajectory = cls(**kwargs)
+        trajectory.extend(x=x, y=y, frame=frame, valid=valid, area=area, measured=measured)
+
+        return trajectory
+
+    def _grow(self, capacity):
+        """
+        Grow the arrays to hold at least capacity frames
+
+        Parameters
+        ----------
+        capacity : int
+
+        Returns
+        -------
+
+        """
+
+        if self.memmap_dir is None:
+            # Double the memory arrays, the copy is amortized
+            capacity = max(capacity, 2 * self.capacity, self.chunk_size)
+        else:
+            # Extending a file doesn't copy, grow by chunks
+            capacity = -(-capacity // self.chunk_size) * self.chunk_size
+
+        for name, dtype in TRAJECTORY_FIELDS.items():
+            if self.memmap_dir is None:
+                array = np.empty(capacity, dtype=dtype)
+                array[:self.length] = self._arrays[name][:self.length]
+            else:
+                path = os.path.join(self.memmap_dir, f'{name}.dat')
+                if isinstance(self._arrays[name], np.memmap):
+                    self._arrays[name].flush()
+                # Release the old mapping before resizing the file, required on Windows
+                self._arrays[name] = np.empty(0, dtype=dtype)
+                with open(path, 'r+b' if self.capacity else 'wb') as f:
+                    f.truncate(capacity * np.dtype(dtype).itemsize)
+                array = np.memmap(path, dtype=dtype, mode='r+', shape=(capacity,))
+            self._arrays[name] = array
+
+        self.capacity = capacity
+
+    def append(self, frame, x, y, valid=True, area=0, measured=True):
+        """
+        Append a frame
+
+        Parameters
+        ----------
+        frame : int
+        x, y : int
+        valid : bool, optional
+        area : float, optional
+        measured : bool, optional
+
+        Returns
+        -------
+
+        """
+
+        if self.length == self.capacity:
+            self._grow(self.length + 1)
+
+        idx = self.length
+        arrays = self._arrays
+        arrays['frame'][idx] = frame
+        arrays['x'][idx] = x
+        arrays['y'][idx] = y
+        arrays['valid'][idx] = valid
+        arrays['area'][idx] = area
+        arrays['measured'][idx] = measured
+        self.length += 1
+
+    def extend(self, x, y, frame=None, valid=None, area=None, measured=None):
+        """
+        Append frames from arrays
+
+        Parameters
+        ----------
+        x, y : List or Array
+        frame : Array, optional
+            Default is continued from the last frame
+        valid : Array, optional
+            Default is all detected
+        area : Array, optional
+            Default is 0
+        measured : Array, optional
+            Default is all measured
+
+        Returns
+        -------
+
+        """
+
+        n = len(x)
+        if self.length + n > self.capacity:
+            self._grow(self.length + n)
+
+        if frame is None:
+            first = int(self._arrays['frame'][self.length - 1]) + 1 if self.length else 0
+            frame = np.arange(first, first + n)
+
+        part = slice(self.length, self.length + n)
+        self._arrays['frame'][part] = frame
+        self._arrays['x'][part] = x
+        self._arrays['y'][part] = y
+        self._arrays['valid'][part] = True if valid is None else valid
+        self._arrays['area'][part] = 0 if area is None else area
+        self._arrays['measured'][part] = True if measured is None else measured
+        self.length += n
+
+    def interpolated(self, memmap_dir=None, last_frame=None):
+        """
+        Full-rate trajectory from a subsampled one, the positions of the frames between two
+        measured frames are linearly interpolated, the frames after the last measured one up to
+        last_frame hold its position. The interpolated frames are not measured, not detected and
+        their area is 0.
+
+        Parameters
+        ----------
+        memmap_dir : str, optional
+            memmap_dir of the new trajectory, should not be the one of this trajectory
+        last_frame : int, optional
+            Last frame of the new trajectory, included. Default is None, the last frame of this one
+
+        Returns
+        -------
+        trajectory : Trajectory
+            Trajectory with every frame from the first frame of this one to last_frame
+        """
+
+        trajectory = Trajectory(chunk_size=self.chunk_size, memmap_dir=memmap_dir)
+        if self.length == 0:
+            return trajectory
+
+        if last_frame is None or last_frame < self.frame[-1]:
+            last_frame = self.frame[-1]
+        # np.interp holds the last position after the last measured frame
+        frame = np.arange(self.frame[0], last_frame + 1, dtype=np.int32)
+        measured_idx = self.frame - self.frame[0]
+
+        valid = np.zeros(len(frame), dtype=bool)
+        valid[measured_idx] = self.valid
+        area = np.zeros(len(frame), dtype=np.float32)
+        area[measured_idx] = self.area
+        measured = np.zeros(len(frame), dtype=bool)
+        measured[measured_idx] = self.measured
+
+        trajectory.extend(x=np.rint(np.interp(frame, self.frame, self.x)),
+                          y=np.rint(np.interp(frame, self.frame, self.y)),
+                          frame=frame, valid=valid, area=area, measured=measured)
+
+        return trajectory
+
+    def flush(self):
+        """
+        Flush the memory-mapped arrays to the files
+
+        Returns
+        -------
+
+        """
+
+        for array in self._arrays.values():
+            if isinstance(array, np.memmap):
+                array.flush()
+
+    def __len__(self):
+        return self.length
+
+    def __getitem__(self, name):
+        return self._arrays[name][:self.length]
+
+    @property
+    def frame(self):
+        return self['frame']
+
+    @property
+    def x(self):
+        return self['x']
+
+    @property
+    def y(self):
+        return self['y']
+
+    @property
+    def valid(self):
+        return self['valid']
+
+    @property
+    def area(self):
+        return self['area']
+
+    @property
+    def measured(self):
+        return self['measured']
@@ -8,6 +8,10 @@
 @Description: Utils for MiTrace
 """
 import cv2
+import numpy as np
+
+from MiTrace.trace.detectors import detect_contour
+from MiTrace.trace.roi import draw_roi
 
 
 def decorate_image(image, roi_lst, roi_name_lst):
@@ -19,6 +23,7 @@ def decorate_image(image, roi_lst, roi_name_lst):
     image : Array
         image to be decorated
     roi_lst : List
+        rectangle [x, y, width, height], polygon or circle rois, see MiTrace.trace.roi
     roi_name_lst : List
     Returns
     -------
@@ -27,79 +32,86 @@ def decorate_image(image, roi_lst, roi_name_lst):
 
     if roi_lst:
         for idx, each in enumerate(roi_lst):
-            image = cv2.rectangle(image,
-                                  (each[0], each[1]),
-                                  (each[0] + each[2], each[1] + each[3]),
-                                  color=(255, 255, 255))
-            image = cv2.putText(image,
-                                roi_name_lst[idx],
-                                (each[0], each[1]), cv2.FONT_HERSHEY_SIMPLEX, 0.5,
-                                (255, 255, 255), 1)
+            image = draw_roi(image, each, roi_name_lst[idx])
 
     return image
 
 
-def drawTrackLine(frame, x_lst, y_lst, history):
+def detect_frame(frame):
     """
+    Detect a single frame of the video, do tracking and return the x, y of object.
+    Same with MiTrace.trace.detectors.detect_contour, kept for the old callers
+
     Parameters
     ----------
-    frame : Array
-        Frame will draw a line on it
-    x_lst, y_lst : List
-        line track positions
-    history : int
-        Define the history positions length
+    frame : A frame of the whole video
 
     Returns
     -------
+    x : int
+        object's x position
+    y : int
+        object's y position
+    largest_contour : Array
+        contour of object
 
     """
-    try:
-        for i in range(1, history):
-            if x_lst[-i] != -1 and x_lst[-i - 1] != -1:
-                cv2.line(frame, (x_lst[-i], y_lst[-i]), (x_lst[-i - 1], y_lst[-i - 1]), (255, 255, 255), 2)
-    except IndexError as e:
-        print(e)
-        pass
 
+    detected = detect_contour(frame)
+    if detected.contour is None:
+        return -1, -1, []
 
-def detect_frame(frame):
+    return detected.x, detected.y, detected.contour
+
+
+def crop_frame(original_frame, resize):
     """
-    Detect a single frame of the video, do tracking and return the x, y of object
+    Crop the frame without copying
 
     Parameters
     ----------
-    frame : A frame of the whole video
+    original_frame : Array
+        Frame from video
+    resize : List
+        [x, y, width, height], same with the video_adjust in Detection. None for no crop
 
     Returns
     -------
-    x : int
-        object's x position
-    y : int
-        object's y position
-    largest_contour : Array
-        contour of object
+    frame : Array
+        View of the original frame
+    """
+
+    # Grab from top left
+    # Resize the frame of the original frame
+    if resize:
+        return original_frame[
+               resize[1]: resize[1] + resize[3],
+               resize[0]: resize[0] + resize[2]
+               ]
+
+    return original_frame
+
+
+def crop_size(width, height, resize):
+    """
+    Size of the frames cropped by crop_frame, without a frame
+
+    Parameters
+    ----------
+    width, height : int
+        Size of the frames of the video
+    resize : List
+        [x, y, width, height], same with crop_frame
 
+    Returns
+    -------
+    width, height : int
     """
 
-    contours, hierarchy = cv2.findContours(frame, cv2.RETR_TREE, cv2.CHAIN_APPROX_SIMPLE)
-    try:
-        largest_contour = max(contours, key=cv2.contourArea)
-        M = cv2.moments(largest_contour)
-        x = int(M["m10"] / M["m00"])
-        y = int(M["m01"] / M["m00"])
-    except ZeroDivisionError as e:
-        print(e)
-        x = -1
-        y = -1
-        largest_contour = []
-    except ValueError as e:
-        print(e)
-        x = -1
-        y = -1
-        largest_contour = []
+    # A broadcast array has the shape without the memory
+    height, width = crop_frame(np.broadcast_to(np.uint8(0), (height, width)), resize).shape
 
-    return x, y, largest_contour
+    return width, height
 
 
 def frame_producer(original_frame, resize, threshold):
@@ -124,18 +136,109 @@ def frame_producer(original_frame, resize, threshold):
         Frame in threshold range
     """
 
-    # Grab from top left
-    # Resize the frame of the original frame
-    if resize:
-        frame = original_frame[
-                resize[1]: resize[1] + resize[3],
-                resize[0]: resize[0] + resize[2]
-                ]
-    else:
-        frame = original_frame
+    frame = crop_frame(original_frame=original_frame, resize=resize)
 
     frame_gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
     frame_blur = cv2.GaussianBlur(frame_gray, (7, 7), 5, 5)
     frame_thresh = cv2.inRange(frame_blur, 0, threshold)
 
     return frame, frame_thresh
+
+
+def forward_fill(x_lst, y_lst, initial=(0, 0)):
+    """
+    Replace the missed detections (x == -1) with the most previous detected position,
+    same with what Detection.detect_video does frame by frame, but vectorized
+
+    Parameters
+    ----------
+    x_lst, y_lst : List or Array
+        Raw positions from detect_frame, -1 for not detected
+    initial : tuple, optional
+        (x, y) used before the first detected position. Default is (0, 0)
+
+    Returns
+    -------
+    x_lst, y_lst : Array
+        Positions with the missed detections filled
+    """
+
+    x_lst = np.asarray(x_lst)
+    y_lst = np.asarray(y_lst)
+
+    # Prepend the initial position, so the frames before the first detection point to it
+    x_lst = np.concatenate([[initial[0]], x_lst])
+    y_lst = np.concatenate([[initial[1]], y_lst])
+    idx = np.where(x_lst != -1, np.arange(len(x_lst)), 0)
+    idx[0] = 0
+    np.maximum.accumulate(idx, out=idx)
+
+    return x_lst[idx][1:], y_lst[idx][1:]
+
+
+def true_runs(mask):
+    """
+    Run-length encoding of the True values of a boolean array
+
+    Parameters
+    ----------
+    mask : List or Array
+        1-D boolean array
+
+    Returns
+    -------
+    starts : Array
+        Index of the first element of each run of True
+    lengths : Array
+        Length of each run of True
+    """
+
+    mask = np.asarray(mask, dtype=bool)
+    padded = np.concatenate([[False], mask, [False]])
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts = edges[::2]
+
+    return starts, edges[1::2] - starts
+
+
+def decimate_path(x_lst, y_lst, epsilon=1.0, max_points=None):
+    """
+    Fewer points of a path with the same shape for plotting. The repeated positions are dropped,
+    then the path is simplified by Douglas-Peucker (cv2.approxPolyDP), no point of the path is
+    farther than epsilon from the simplified one
+
+    Parameters
+    ----------
+    x_lst, y_lst : List or Array
+        Positions, the missed detections already filled
+    epsilon : float, optional
+        Largest deviation in pixels. Default is 1.0, 0 only drops the repeated positions
+    max_points : int, optional
+        If more points are left, e.g. for a noisy trajectory, keep every k-th point of them, so the
+        plot has a bounded size. Default is None, no limit
+
+    Returns
+    -------
+    x_lst, y_lst : Array
+        Positions kept, the first and the last ones are always kept
+    """
+
+    x_lst = np.asarray(x_lst)
+    y_lst = np.asarray(y_lst)
+    if len(x_lst) < 3:
+        return x_lst, y_lst
+
+    # A position is kept if it differs from the previous one
+    keep = np.empty(len(x_lst), dtype=bool)
+    keep[0] = True
+    keep[1:] = (x_lst[1:] != x_lst[:-1]) | (y_lst[1:] != y_lst[:-1])
+    keep[-1] = True
+    points = np.column_stack([x_lst[keep], y_lst[keep]]).astype(np.int32).reshape(-1, 1, 2)
+
+    if epsilon > 0:
+        points = cv2.approxPolyDP(points, epsilon, False)
+
+    if max_points is not None and len(points) > max(2, max_points):
+        points = points[np.round(np.linspace(0, len(points) - 1, max(2, max_points))).astype(np.int64)]
+
+    return points[:, 0, 0], points[:, 0, 1]
@@ -0,0 +1,373 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: benchmark.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 12:20
+@Description: Benchmarks of MiTrace, run from the MiTrace's parent folder by `python ./test/benchmark.py`
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.append(os.getcwd())
+from MiTrace.trace.analysis import Analysis
+from MiTrace.trace.detection import Detection
+from MiTrace.trace.detectors import DETECTORS
+from MiTrace.utils.utils import frame_producer, detect_frame
+
+
+def random_walk(n_frames, width=640, height=480, seed=0):
+    """
+    A random walk trajectory inside a width x height arena
+
+    Parameters
+    ----------
+    n_frames : int
+    width, height : int
+    seed : int
+
+    Returns
+    -------
+    x_lst, y_lst : Array
+    """
+
+    rng = np.random.default_rng(seed)
+    x_lst = np.cumsum(rng.integers(-3, 4, n_frames)) % width
+    y_lst = np.cumsum(rng.integers(-3, 4, n_frames)) % height
+
+    return x_lst.astype(np.int32), y_lst.astype(np.int32)
+
+
+def bench_result_sheet(sizes):
+    """
+    Time Analysis.get_result_sheet with different trajectory length
+
+    Parameters
+    ----------
+    sizes : List
+        Number of frames of each run
+
+    Returns
+    -------
+    results : List
+        A dict for each run
+    """
+
+    results = []
+    for n_frames in sizes:
+        x_lst, y_lst = random_walk(n_frames)
+        analysis = Analysis(x_lst=x_lst, y_lst=y_lst, video_adjust=[0, 0, 640, 480])
+
+        start_time = time.perf_counter()
+        analysis.get_result_sheet()
+        used = time.perf_counter() - start_time
+
+        results.append({
+            'benchmark': 'get_result_sheet',
+            'frames': n_frames,
+            'seconds': round(used, 4),
+            'ns_per_frame': round(used / n_frames * 1e9, 2),
+            'sheet_bytes': int(analysis.result_df.memory_usage(index=False).sum()),
+        })
+        print(results[-1])
+
+    return results
+
+
+def synthetic_video(path, n_frames=1000, width=640, height=480, radius=12, noise=8.0, fps=30, seed=0):
+    """
+    Write a video of a dark blob moving on a light arena along a known Lissajous path,
+    with gaussian pixel noise
+
+    Parameters
+    ----------
+    path : str
+        Path of the video, written as MJPG avi
+    n_frames : int
+    width, height : int
+        Resolution of the video
+    radius : int
+        Radius of the blob in pixels
+    noise : float
+        Standard deviation of the pixel noise
+    fps : int
+    seed : int
+
+    Returns
+    -------
+    x_lst, y_lst : Array
+        Ground truth position of the blob in each frame
+    """
+
+    t = np.arange(n_frames) / fps
+    margin = radius + 2
+    x_lst = np.rint(width / 2 + (width / 2 - margin) * np.sin(2 * np.pi * t / 17)).astype(np.int32)
+    y_lst = np.rint(height / 2 + (height / 2 - margin) * np.sin(2 * np.pi * t / 11 + 1)).astype(np.int32)
+
+    rng = np.random.default_rng(seed)
+    background = np.full((height, width, 3), 200, dtype=np.uint8)
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), fps, (width, height))
+    for x, y in zip(x_lst, y_lst):
+        frame = background.copy()
+        cv2.circle(frame, (int(x), int(y)), radius, (20, 20, 20), -1)
+        if noise:
+            frame = np.clip(frame + rng.normal(0, noise, (height, width, 1)), 0, 255).astype(np.uint8)
+        writer.write(frame)
+    writer.release()
+
+    return x_lst, y_lst
+
+
+def measure(func, *args, **kwargs):
+    """
+    Run a function, measure the time used and the peak memory allocated by Python and numpy.
+    The buffers allocated inside OpenCV are not traced
+
+    Returns
+    -------
+    result : object
+        Returned by func
+    seconds : float
+    peak_bytes : int
+    """
+
+    tracemalloc.start()
+    start_time = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+        used = time.perf_counter() - start_time
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return result, used, peak
+
+
+def read_video(path, n_frames):
+    frames = []
+    cv_capture = cv2.VideoCapture(path)
+    while len(frames) < n_frames:
+        ret, frame = cv_capture.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cv_capture.release()
+
+    return frames
+
+
+def bench_frame(video_path, threshold=30, n_frames=300):
+    """
+    Time frame_producer, detect_frame and each detector on decoded frames, the decoding is
+    not counted
+
+    Parameters
+    ----------
+    video_path : str
+    threshold : int
+    n_frames : int
+        Number of frames to use
+
+    Returns
+    -------
+    results : List
+        A dict for each benchmark
+    """
+
+    frames = read_video(video_path, n_frames)
+    results = []
+
+    def run_producer():
+        return [frame_producer(original_frame=frame, resize=None, threshold=threshold)[1] for frame in frames]
+
+    frame_thresh_lst, used, peak = measure(run_producer)
+    results.append({'benchmark': 'frame_producer', 'frames': len(frames), 'seconds': round(used, 4),
+                    'fps': round(len(frames) / used, 1), 'peak_bytes': peak})
+
+    targets = [('detect_frame', detect_frame)] + [(f'detector:{name}', each) for name, each in DETECTORS.items()]
+    for name, detector in targets:
+        _, used, peak = measure(lambda: [detector(each) for each in frame_thresh_lst])
+        results.append({'benchmark': name, 'frames': len(frames), 'seconds': round(used, 4),
+                        'fps': round(len(frames) / used, 1), 'peak_bytes': peak})
+
+    for each in results:
+        print(each)
+
+    return results
+
+
+def accuracy(x_lst, y_lst, valid, x_truth, y_truth):
+    """
+    Error of a recovered trajectory against the ground truth
+
+    Returns
+    -------
+    accuracy : dict
+        detection rate, mean, 95th percentile and max of the position error in pixels
+    """
+
+    n_frames = min(len(x_lst), len(x_truth))
+    error = np.hypot(np.asarray(x_lst[:n_frames], dtype=float) - x_truth[:n_frames],
+                     np.asarray(y_lst[:n_frames], dtype=float) - y_truth[:n_frames])
+
+    return {
+        'detection_rate': round(float(np.mean(valid[:n_frames])), 4) if n_frames else 0.0,
+        'error_mean': round(float(error.mean()), 3) if n_frames else None,
+        'error_p95': round(float(np.percentile(error, 95)), 3) if n_frames else None,
+        'error_max': round(float(error.max()), 3) if n_frames else None,
+    }
+
+
+def bench_detect_video(video_path, x_truth, y_truth, configs, threshold=30):
+    """
+    Time the headless Detection.detect_video with different parameters, and compare the
+    trajectories against the ground truth
+
+    Parameters
+    ----------
+    video_path : str
+    x_truth, y_truth : Array
+        Ground truth positions from synthetic_video
+    configs : List
+        Keyword arguments of Detection for each run
+    threshold : int
+
+    Returns
+    -------
+    results : List
+        A dict for each run
+    detection : Detection
+        Detection of the last run
+    """
+
+    results = []
+    detection = None
+    for config in configs:
+        cv_capture = cv2.VideoCapture(video_path)
+        width = int(cv_capture.get(cv2.CAP_PROP_FRAME_WIDTH))
+        height = int(cv_capture.get(cv2.CAP_PROP_FRAME_HEIGHT))
+        detection = Detection(cv_capture=cv_capture, video_adjust=[0, 0, width, height], threshold=threshold,
+                              display=False, **config)
+        _, used, peak = measure(detection.detect_video)
+
+        trajectory = detection.trajectory
+        results.append({
+            'benchmark': 'detect_video',
+            'config': config,
+            'frames': len(trajectory),
+            'seconds': round(used, 4),
+            'fps': round(len(trajectory) / used, 1),
+            'peak_bytes': peak,
+            **accuracy(trajectory.x, trajectory.y, trajectory.valid, x_truth, y_truth),
+        })
+        print(results[-1])
+
+    return results, detection
+
+
+def bench_save_results(trajectory, width, height, formats_lst):
+    """
+    Time Analysis.save_results for each result format
+
+    Parameters
+    ----------
+    trajectory : Trajectory
+    width, height : int
+        Size of the video, two rois are put on its halves
+    formats_lst : List
+        Formats of each run
+
+    Returns
+    -------
+    results : List
+        A dict for each run
+    """
+
+    roi_lst = [[0, 0, width // 2, height], [width // 2, 0, width // 2, height]]
+    results = []
+    for formats in formats_lst:
+        analysis = Analysis(trajectory=trajectory, video_adjust=[0, 0, width, height], roi_lst=roi_lst,
+                            roi_name_lst=['left', 'right'])
+        with tempfile.TemporaryDirectory() as folder_path:
+            _, used, peak = measure(analysis.save_results, folder_path, formats=formats)
+            size = sum(os.path.getsize(os.path.join(folder_path, each)) for each in os.listdir(folder_path))
+
+        results.append({'benchmark': 'save_results', 'formats': list(formats), 'frames': len(trajectory),
+                        'seconds': round(used, 4), 'fps': round(len(trajectory) / used, 1),
+                        'peak_bytes': peak, 'file_bytes': size})
+        print(results[-1])
+
+    return results
+
+
+def bench_pipeline(n_frames, width, height, noise, seed=0, threshold=30):
+    """
+    Generate a synthetic video and run the frame, detect_video and save_results benchmarks on it
+
+    Returns
+    -------
+    results : List
+    """
+
+    with tempfile.TemporaryDirectory() as folder_path:
+        video_path = os.path.join(folder_path, 'synthetic.avi')
+        x_truth, y_truth = synthetic_video(video_path, n_frames=n_frames, width=width, height=height,
+                                           noise=noise, seed=seed)
+
+        results = bench_frame(video_path, threshold=threshold, n_frames=min(n_frames, 300))
+        configs = [{}, {'queue_depth': 8}, {'search_radius': 40}] + \
+                  [{'detector': name} for name in DETECTORS if name != 'contour']
+        detect_results, detection = bench_detect_video(video_path, x_truth, y_truth, configs, threshold=threshold)
+        results += detect_results
+        results += bench_save_results(detection.trajectory, width, height, [('parquet', 'npz'), ('csv',)])
+
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmarks of MiTrace.')
+    parser.add_argument('--sizes', nargs='+', type=int, default=[10 ** 5, 10 ** 6, 10 ** 7],
+                        help='number of frames for the result sheet benchmark, none to skip it')
+    parser.add_argument('--frames', type=int, default=1000,
+                        help='number of frames of the synthetic video, 0 to skip the pipeline benchmarks')
+    parser.add_argument('--width', type=int, default=640, help='width of the synthetic video')
+    parser.add_argument('--height', type=int, default=480, help='height of the synthetic video')
+    parser.add_argument('--noise', type=float, default=8.0, help='pixel noise of the synthetic video')
+    parser.add_argument('--seed', type=int, default=0, help='seed of the synthetic video')
+    parser.add_argument('-o', '--output', help='save the results into a JSON file')
+    args = parser.parse_args(argv)
+
+    results = []
+    if args.frames > 0:
+        results += bench_pipeline(args.frames, args.width, args.height, args.noise, seed=args.seed)
+    results += bench_result_sheet(args.sizes)
+
+    if args.output:
+        report = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'environment': {
+                'python': platform.python_version(),
+                'numpy': np.__version__,
+                'opencv': cv2.__version__,
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+            },
+            'arguments': vars(args),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: conftest.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/19 10:30
+@Description: Fixtures of the regression tests, run from the MiTrace's parent folder by `python -m pytest test`
+"""
+import os
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+sys.path.append(os.getcwd())
+
+# The synthetic video, a dark disk moving on a light background, missed every 29 frames
+VIDEO_FRAMES = 120
+VIDEO_FPS = 30
+VIDEO_WIDTH = 160
+VIDEO_HEIGHT = 120
+
+
+def disk_position(idx):
+    """
+    Center of the disk in frame idx
+
+    Parameters
+    ----------
+    idx : int
+
+    Returns
+    -------
+    x, y : int
+    """
+
+    return int(80 + 50 * np.cos(idx / 15)), int(60 + 35 * np.sin(idx / 11))
+
+
+@pytest.fixture(scope='session')
+def video_path(tmp_path_factory):
+    path = str(tmp_path_factory.mktemp('video') / 'synthetic.avi')
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*'MJPG'), VIDEO_FPS, (VIDEO_WIDTH, VIDEO_HEIGHT))
+    for idx in range(VIDEO_FRAMES):
+        image = np.full((VIDEO_HEIGHT, VIDEO_WIDTH, 3), 200, dtype=np.uint8)
+        if idx % 29 != 7:
+            cv2.circle(image, disk_position(idx), 8, (20, 20, 20), -1)
+        writer.write(image)
+    writer.release()
+
+    return path
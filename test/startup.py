@@ -0,0 +1,122 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: startup.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/18 21:50
+@Description: Startup time of the entries of MiTrace, run from the MiTrace's parent folder by `python ./test/startup.py`
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+
+# Libraries only needed when saving the results, and the GUI
+HEAVY_MODULES = ('PyQt5', 'matplotlib', 'pandas', 'scipy', 'pyarrow')
+
+# Entry name: (code run in a new interpreter, modules it must not import)
+ENTRIES = {
+    'cli': ('import MiTrace.__main__', HEAVY_MODULES),
+    'headless': ('import MiTrace.io.headless', HEAVY_MODULES),
+    'batch': ('import MiTrace.io.batch', HEAVY_MODULES),
+    'gui': ('from PyQt5.QtWidgets import QApplication\n'
+            'app = QApplication([])\n'
+            'from MiTrace.io.load_video import load_gui\n'
+            'window = load_gui()\n'
+            'window.show()\n'
+            'app.processEvents()', ('matplotlib', 'pandas', 'scipy', 'pyarrow')),
+}
+
+# Run in the new interpreter, print the time of the code and the heavy modules imported
+PROBE = '''
+import json, sys, time
+start = time.perf_counter()
+exec(compile({code!r}, '<entry>', 'exec'))
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'modules': [name for name in {heavy!r}
+                                                    if any(each == name or each.startswith(name + '.')
+                                                           for each in sys.modules)]}}))
+'''
+
+
+def measure(code, repeat=5):
+    """
+    Run the code in a new interpreter repeat times
+
+    Parameters
+    ----------
+    code : str
+    repeat : int, optional
+
+    Returns
+    -------
+    result : dict
+        Median of the time of the code and of the whole interpreter in seconds, and the heavy
+        modules imported
+    """
+
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    import_times, process_times, modules = [], [], []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, '-c', PROBE.format(code=code, heavy=HEAVY_MODULES)],
+                                capture_output=True, text=True, env=env, cwd=os.getcwd(), check=True).stdout
+        process_times.append(time.perf_counter() - start)
+        probe = json.loads(output.strip().splitlines()[-1])
+        import_times.append(probe['seconds'])
+        modules = probe['modules']
+
+    return {
+        'seconds': round(sorted(import_times)[len(import_times) // 2], 4),
+        'process_seconds': round(sorted(process_times)[len(process_times) // 2], 4),
+        'modules': modules,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Startup time of the entries of MiTrace.')
+    parser.add_argument('--entries', nargs='+', choices=tuple(ENTRIES), default=list(ENTRIES),
+                        help='entries to measure')
+    parser.add_argument('--repeat', type=int, default=5, help='runs of each entry, the median is reported')
+    parser.add_argument('--max-seconds', type=float,
+                        help='fail if the startup of an entry takes longer than this')
+    parser.add_argument('-o', '--output', help='save the results into a JSON file')
+    args = parser.parse_args(argv)
+
+    results, failures = [], []
+    for name in args.entries:
+        code, forbidden = ENTRIES[name]
+        result = dict(entry=name, **measure(code, repeat=args.repeat))
+        results.append(result)
+        print(f'{name}: {result["seconds"]} s, {result["process_seconds"]} s with the interpreter, '
+              f'heavy modules {result["modules"]}')
+
+        imported = sorted(set(result['modules']) & set(forbidden))
+        if imported:
+            failures.append(f'{name} imports {imported} at startup')
+        if args.max_seconds is not None and result['seconds'] > args.max_seconds:
+            failures.append(f'{name} takes {result["seconds"]} s, more than {args.max_seconds} s')
+
+    if args.output:
+        report = {
+            'time': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+            },
+            'arguments': vars(args),
+            'results': results,
+        }
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, indent=4)
+
+    if failures:
+        raise SystemExit('\n'.join(failures))
+
+
+if __name__ == '__main__':
+    main()
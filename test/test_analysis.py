@@ -0,0 +1,65 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: test_analysis.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/19 10:30
+@Description: Regression tests of the arenas and of the frames in the result tables
+"""
+import numpy as np
+import pandas as pd
+import pytest
+
+from MiTrace.io.headless import run_video
+from MiTrace.trace.arena import make_arenas
+from MiTrace.trace.roi import roi_name
+
+from conftest import VIDEO_FPS, VIDEO_FRAMES
+
+
+def test_arena_rois_named_by_themselves():
+    arenas = make_arenas([{'name': 'left', 'roi_lst': [[0, 0, 40, 40]]}, {'name': 'right'}],
+                         video_adjust=[0, 0, 160, 120], roi_lst=[[0, 0, 10, 10], [20, 20, 10, 10]],
+                         roi_name_lst=['a', 'b'])
+
+    assert arenas[0]['roi_name_lst'] == [roi_name([0, 0, 40, 40])]
+    assert arenas[1]['roi_name_lst'] == ['a', 'b']
+
+
+def test_arena_roi_names_checked_before_detecting():
+    with pytest.raises(ValueError):
+        make_arenas([{'roi_lst': [[0, 0, 40, 40]], 'roi_name_lst': ['a', 'b']}], video_adjust=[0, 0, 160, 120])
+
+
+def test_arena_with_own_rois_saves_results(video_path, tmp_path):
+    arenas = [{'name': 'left', 'video_adjust': [0, 0, 80, 120], 'roi_lst': [[0, 0, 40, 40]]},
+              {'name': 'right', 'video_adjust': [80, 0, 80, 120]}]
+    run_video(video_path, str(tmp_path), roi_lst=[[0, 0, 40, 60], [40, 60, 40, 60]], roi_name_lst=['a', 'b'],
+              arenas=arenas, formats=['parquet'])
+
+    assert pd.read_parquet(tmp_path / 'left' / 'roi_summary.parquet')['roi name'].tolist() == \
+           [roi_name([0, 0, 40, 40])]
+    assert pd.read_parquet(tmp_path / 'right' / 'roi_summary.parquet')['roi name'].tolist() == ['a', 'b']
+
+
+@pytest.mark.parametrize('stride', [1, 3])
+def test_frames_from_start_frame(video_path, tmp_path, stride):
+    start_frame = 20
+    roi = [0, 0, 80, 120]
+    run_video(video_path, str(tmp_path), roi_lst=[roi], start_frame=start_frame, frame_stride=stride,
+              bin_seconds=1, formats=['parquet'])
+
+    trace = pd.read_parquet(tmp_path / 'trace_result.parquet')
+    np.testing.assert_array_equal(trace['frame'], np.arange(start_frame, VIDEO_FRAMES))
+    np.testing.assert_allclose(trace['time'], trace['frame'] / VIDEO_FPS)
+
+    time_bins = pd.read_parquet(tmp_path / 'time_bins.parquet')
+    assert time_bins['start frame'].iloc[0] == start_frame
+    assert time_bins['frames'].sum() == len(trace)
+    np.testing.assert_allclose(time_bins['distance'].sum(), trace['distance'].sum(), atol=1e-3)
+
+    # The first entry is a frame of the video, the first one in the roi
+    in_roi = (trace['x_coordinate'] >= roi[0]) & (trace['x_coordinate'] <= roi[0] + roi[2])
+    first_entry = pd.read_parquet(tmp_path / 'roi_summary.parquet')['first entry frame'].iloc[0]
+    assert first_entry == trace['frame'][in_roi.to_numpy().argmax()]
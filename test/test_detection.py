@@ -0,0 +1,61 @@
+# -*- coding: UTF-8 -*-
+"""
+@Project: MiTrace
+@File: test_detection.py
+@IDE: PyCharm
+@Author: Xueqiang Wang
+@Date: 2026/10/19 10:30
+@Description: Regression tests of the frame stride, the end of the video and the parallel detection
+"""
+import cv2
+import numpy as np
+import pytest
+
+from MiTrace.trace.detection import Detection
+from MiTrace.trace.parallel import detect_video_parallel
+
+from conftest import VIDEO_FRAMES
+
+
+def detect(video_path, **kwargs):
+    detection = Detection(cv_capture=cv2.VideoCapture(video_path), video_adjust=[0, 0, -1, -1], display=False,
+                          **kwargs)
+    detection.detect_video()
+
+    return detection.trajectory
+
+
+@pytest.mark.parametrize('stride', [1, 2, 3, 4, 7])
+@pytest.mark.parametrize('queue_depth', [0, 4])
+def test_stride_keeps_every_frame(video_path, stride, queue_depth):
+    trajectory = detect(video_path, frame_stride=stride, queue_depth=queue_depth)
+
+    assert len(trajectory) == VIDEO_FRAMES
+    np.testing.assert_array_equal(trajectory.frame, np.arange(VIDEO_FRAMES))
+    # The frames after the last detected one hold its position
+    last = (VIDEO_FRAMES - 1) // stride * stride
+    assert np.all(trajectory.x[last:] == trajectory.x[last])
+
+
+@pytest.mark.parametrize('workers', [None, 1, 3])
+def test_stride_tail_stops_at_end_of_video(video_path, workers):
+    # The range goes past the end of the video
+    start_frame, end_frame, stride = VIDEO_FRAMES - 10, VIDEO_FRAMES + 100, 4
+    if workers is None:
+        trajectory = detect(video_path, start_frame=start_frame, end_frame=end_frame, frame_stride=stride)
+    else:
+        trajectory, _ = detect_video_parallel(video_path, video_adjust=[0, 0, -1, -1], start_frame=start_frame,
+                                              end_frame=end_frame, frame_stride=stride, n_workers=workers)
+
+    np.testing.assert_array_equal(trajectory.frame, np.arange(start_frame, VIDEO_FRAMES))
+
+
+@pytest.mark.parametrize('stride', [1, 3])
+@pytest.mark.parametrize('end_frame', [-1, VIDEO_FRAMES - 13])
+def test_parallel_same_as_sequential(video_path, stride, end_frame):
+    sequential = detect(video_path, start_frame=5, end_frame=end_frame, frame_stride=stride)
+    parallel, _ = detect_video_parallel(video_path, video_adjust=[0, 0, -1, -1], start_frame=5, end_frame=end_frame,
+                                        frame_stride=stride, n_workers=3)
+
+    for name in ('frame', 'x', 'y', 'valid', 'measured'):
+        np.testing.assert_array_equal(parallel[name], sequential[name], err_msg=name)